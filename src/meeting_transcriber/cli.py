@@ -7,12 +7,16 @@ import warnings
 warnings.filterwarnings("ignore")
 
 import argparse
+import os
 import subprocess
 import sys
 from pathlib import Path
 
 from .context_loader import apply_normalization, asr_glossary, expected_speakers, load_context
-from .transcriber import DEFAULT_MODEL, format_timestamp, transcribe_video
+
+# transcriber は mlx_whisper を遅延 import するので軽い。torch/pyannote/mlx を読む重いモジュールは
+# 各モードの分岐内で import する（--help / --watch / --kill を即座に起動させるため）。
+from .transcriber import DEFAULT_MODEL, MLX_MODELS, format_timestamp
 
 LOG_FILE = Path("/tmp/meeting-transcriber.log")
 
@@ -27,31 +31,52 @@ def watch_progress():
         pass
 
 
-def should_skip_process(pid: int, current_pid: int) -> bool:
+def _list_processes() -> list[tuple[int, str]]:
+    """全プロセスの (pid, コマンドライン) を1回で列挙する。
+
+    Linux は /proc/<pid>/cmdline を直接読む（サブプロセス無し）。/proc が無い macOS は
+    `ps -axo pid=,args=` を1回だけ呼ぶ（パターンごとの pgrep ＋ PIDごとの ps を置き換え）。
+    """
+    procs: list[tuple[int, str]] = []
+    if os.path.isdir("/proc"):
+        for entry in os.scandir("/proc"):
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(os.path.join(entry.path, "cmdline"), "rb") as f:
+                    raw = f.read()
+            except OSError:
+                continue
+            if raw:
+                procs.append((int(entry.name), raw.replace(b"\0", b" ").decode("utf-8", "replace").strip()))
+        return procs
+
+    result = subprocess.run(["ps", "-axo", "pid=,args="], capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        pid_str, _, cmdline = line.strip().partition(" ")
+        if pid_str.isdigit():
+            procs.append((int(pid_str), cmdline.strip()))
+    return procs
+
+
+def should_skip_process(pid: int, current_pid: int, cmdline: str) -> bool:
     """Check if a process should be skipped (watch, kill, tail, or current process)."""
     if pid == current_pid:
         return True
-    try:
-        result = subprocess.run(["ps", "-p", str(pid), "-o", "args="], capture_output=True, text=True)
-        if result.returncode == 0:
-            cmdline = result.stdout.strip()
-            # Skip watch processes
-            if "--watch" in cmdline or " -w " in cmdline or cmdline.endswith(" -w"):
-                return True
-            # Skip kill processes (including this one)
-            if "--kill" in cmdline or " -k " in cmdline or cmdline.endswith(" -k"):
-                return True
-            # Skip tail processes (used by --watch)
-            if cmdline.startswith("tail "):
-                return True
-    except Exception:
-        pass
+    # Skip watch processes
+    if "--watch" in cmdline or " -w " in cmdline or cmdline.endswith(" -w"):
+        return True
+    # Skip kill processes (including this one)
+    if "--kill" in cmdline or " -k " in cmdline or cmdline.endswith(" -k"):
+        return True
+    # Skip tail processes (used by --watch)
+    if cmdline.startswith("tail "):
+        return True
     return False
 
 
 def kill_all_transcribe():
     """Kill all transcribe processes and restart MCP servers."""
-    import os
     import signal
     from datetime import datetime
 
@@ -61,31 +86,22 @@ def kill_all_transcribe():
 
     # "transcribe" pattern matches the CLI process itself.
     # should_skip_process() filters out --watch, --kill, and tail processes.
+    # 先に一致したパターンのバケットに数える（プロセス一覧は1回だけ走査する）。
     patterns = [
         ("transcribe", killed_transcribe),
         ("meeting-transcriber", killed_mcp),
         ("mcp-server", killed_mcp),
     ]
 
-    all_killed = set()
-    for pattern, killed_list in patterns:
-        result = subprocess.run(["pgrep", "-f", pattern], capture_output=True, text=True)
-
-        if result.returncode == 0:
-            pids = result.stdout.strip().split("\n")
-            for pid_str in pids:
-                if pid_str:
-                    pid = int(pid_str)
-                    if pid in all_killed:
-                        continue
-                    if should_skip_process(pid, current_pid):
-                        continue
-                    try:
-                        os.kill(pid, signal.SIGKILL)
-                        killed_list.append(pid)
-                        all_killed.add(pid)
-                    except ProcessLookupError:
-                        pass
+    for pid, cmdline in _list_processes():
+        killed_list = next((bucket for pattern, bucket in patterns if pattern in cmdline), None)
+        if killed_list is None or should_skip_process(pid, current_pid, cmdline):
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed_list.append(pid)
+        except ProcessLookupError:
+            pass
 
     # Write to log file so --watch can see it
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -125,6 +141,121 @@ def resolve_diarizer_backend(args) -> str:
     return "speakrs"
 
 
+def iter_transcript_blocks(segments: tuple):
+    """話者が切り替わるごとに「話者 (mm:ss)」行＋本文行のブロックを順に返す（2件目以降は空行を前置）。
+
+    segments は assign_speakers_to_segments が返す列配列 (starts, ends, speakers, texts)。
+
+    texts は取り込み時（assign_speakers_to_segments）に strip 済みなので、ここでは連結するだけ。
+
+    連結すると従来の output_lines（見出し・本文・空行の繰り返し）を改行で join した結果と同一になる。
+    """
+    starts, _, speakers, texts = segments
+    n = len(speakers)
+    sep = ""
+    run_start = 0
+    # 同じ話者が続く区間 [run_start, i) を1ブロックにまとめる
+    for i in range(1, n + 1):
+        if i < n and speakers[i] == speakers[run_start]:
+            continue
+        timestamp = format_timestamp(float(starts[run_start]))
+        yield "".join((sep, speakers[run_start], " (", timestamp, ")\n", "".join(texts[run_start:i]), "\n"))
+        sep = "\n"
+        run_start = i
+
+
+def _write_all(fd: int, data) -> None:
+    """os.write は途中までしか書かないことがあるので、書き切るまで繰り返す。"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def write_transcript(segments: tuple, output_path: Path, context: dict | None = None) -> list[str]:
+    """話者ブロックを整形して output_path に書き出し、正規化レポートを返す。
+
+    正規化が無ければブロックを生成しながら UTF-8 のバイト列へ積み、1MB ごとに fd へ直接書く
+    （全文の str も TextIOWrapper の行ごとエンコードも持たない。通常の議事録なら write 1回）。
+    決定的(辞書)正規化は全文に対する逐次置換なので、その場合だけ全文を組む。
+    """
+    blocks = iter_transcript_blocks(segments)
+    fd = os.open(str(output_path), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        if hasattr(os, "posix_fadvise"):  # Linux のみ（macOS には無い）
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if context:
+            # 決定的(辞書)正規化: 曖昧さの無い表記ゆれのみ機械置換（文脈依存はClaude校正へ）
+            output_text, norm_report = apply_normalization("".join(blocks), context)
+            _write_all(fd, output_text.encode("utf-8"))
+            return norm_report
+        buf = bytearray()
+        for block in blocks:
+            buf += block.encode("utf-8")
+            if len(buf) >= 1 << 20:
+                _write_all(fd, buf)
+                buf.clear()
+        _write_all(fd, buf)
+        return []
+    finally:
+        os.close(fd)
+
+
+def diarizer_module(backend: str):
+    """backend の話者分離モジュールを返す。重い依存を読むので使う直前に呼ぶ。
+
+    いずれも load_diarization_pipeline / diarize_audio / assign_speakers_to_segments を提供する。
+    """
+    if backend == "pyannote":
+        from . import diarization_v2 as diarizer
+    else:
+        from . import diarization_speakrs as diarizer
+    return diarizer
+
+
+def run_diarization(backend: str, audio_path: str, num_speakers: int | None) -> list[dict]:
+    """パイプラインをロードして話者分離する（enroll / resolve-speakers 用）。"""
+    diarizer = diarizer_module(backend)
+    pipeline = diarizer.load_diarization_pipeline()
+    return diarizer.diarize_audio(audio_path, pipeline, num_speakers=num_speakers)
+
+
+def speaker_count_hint(args, context: dict | None) -> int | None:
+    """話者数ヒント: --speakers 明示 > 案件コンテキスト(expected_speakers/roster件数)。"""
+    return args.speakers if args.speakers is not None else expected_speakers(context)
+
+
+def resolve_project(args) -> tuple[str | None, str | None]:
+    """--project <slug> から (context_path, voiceprint_profile) を解決する。
+
+    案件ストア(~/.claude/meeting-contexts/<slug>.yaml)を context として使い、同一slugの声紋
+    プロファイルも既定で有効にする（声紋と案件ストアを slug で連結）。--context / --voiceprints の
+    明示指定が優先。
+    """
+    context_path = args.context
+    voiceprint_profile = args.voiceprints
+    if args.project:
+        from .context_store import load_project, store_path
+
+        proj = load_project(args.project)
+        if proj is None:
+            print(f"    案件『{args.project}』はまだ未登録（初回として進めます）", flush=True)
+        else:
+            if not context_path:
+                context_path = str(store_path(args.project))
+            if not voiceprint_profile:
+                voiceprint_profile = proj.get("voiceprint_profile") or args.project
+    return context_path, voiceprint_profile
+
+
+def existing_video(video_path: str) -> Path:
+    """動画パスを絶対パスにして返す。無ければエラー終了。"""
+    video = Path(video_path).resolve()
+    if not video.exists():
+        print(f"エラー: ファイルが見つかりません: {video}", file=sys.stderr)
+        sys.exit(1)
+    return video
+
+
 def main():
     parser = argparse.ArgumentParser(description="会議動画から話者識別付き文字起こしを生成")
     parser.add_argument("video_path", nargs="?", help="動画ファイルのパス")
@@ -135,7 +266,7 @@ def main():
         "-m",
         "--model",
         default=DEFAULT_MODEL,
-        choices=["small-4bit", "small", "medium", "large-v3", "large-v3-turbo"],
+        choices=list(MLX_MODELS),
         help=f"Whisperモデルサイズ (default: {DEFAULT_MODEL})",
     )
     parser.add_argument(
@@ -189,7 +320,7 @@ def main():
         choices=["speakrs", "pyannote"],
         default=None,
         help="話者識別バックエンド: speakrs(既定/最速・Apple Silicon CoreML) / "
-        "pyannote(同モデル・CPUで低速)。未指定は speakrs",
+        "pyannote(同モデル・CUDA/MPSがあればGPU)。未指定は speakrs",
     )
     parser.add_argument(
         "--diarization-v2",
@@ -231,10 +362,7 @@ def main():
             parser.error("--enroll には --voiceprints（プロファイル名）が必要です")
         if not args.video_path:
             parser.error("--enroll には動画ファイルのパスが必要です")
-        enroll_video = Path(args.video_path).resolve()
-        if not enroll_video.exists():
-            print(f"エラー: ファイルが見つかりません: {enroll_video}", file=sys.stderr)
-            sys.exit(1)
+        enroll_video = existing_video(args.video_path)
         # マッピングは JSON文字列 or ファイルパス
         import json as _json
 
@@ -249,22 +377,16 @@ def main():
         from .transcriber import ensure_audio
 
         # diarization は transcribe と同じバックエンド（既定 speakrs）に揃える。
-        # pyannote(CPU)で再diarizationすると遅い上、transcribeと話者ラベルの採番がズレて
+        # pyannote で再diarizationすると遅い上、transcribeと話者ラベルの採番がズレて
         # 声紋が誤対応する。speakrs に揃えることで高速化＋ラベル整合を両立する。
         backend = resolve_diarizer_backend(args)
-        if backend == "pyannote":
-            from .diarization_v2 import diarize_audio, load_diarization_pipeline
-        else:
-            from .diarization_speakrs import diarize_audio, load_diarization_pipeline
         from .voiceprint import db_path, enroll
 
         print("声紋登録: 音声準備中（キャッシュ再利用）...", flush=True)
         audio_path = ensure_audio(str(enroll_video))
         print("声紋登録: 話者識別中...", flush=True)
         context = load_context(args.context) if args.context else None
-        num_speakers = args.speakers if args.speakers is not None else expected_speakers(context)
-        pipeline = load_diarization_pipeline()
-        diar = diarize_audio(audio_path, pipeline, num_speakers=num_speakers)
+        diar = run_diarization(backend, audio_path, speaker_count_hint(args, context))
         report = enroll(args.voiceprints, audio_path, mapping, diar)
         print(f"声紋登録完了: {db_path(args.voiceprints)}")
         for name, info in report.items():
@@ -275,22 +397,11 @@ def main():
     if args.resolve_speakers:
         if not args.video_path:
             parser.error("--resolve-speakers には動画ファイルのパスが必要です")
-        rv = Path(args.video_path).resolve()
-        if not rv.exists():
-            print(f"エラー: ファイルが見つかりません: {rv}", file=sys.stderr)
-            sys.exit(1)
+        rv = existing_video(args.video_path)
 
         # 案件 → 声紋プロファイル/コンテキスト解決（--project 指定時）
-        voiceprint_profile = args.voiceprints
-        context = None
-        if args.project:
-            from .context_store import load_project, store_path
-
-            proj = load_project(args.project)
-            if proj:
-                if not voiceprint_profile:
-                    voiceprint_profile = proj.get("voiceprint_profile") or args.project
-                context = load_context(str(store_path(args.project)))
+        context_path, voiceprint_profile = resolve_project(args)
+        context = load_context(context_path) if context_path else None
 
         import json as _json
 
@@ -299,15 +410,8 @@ def main():
         print("話者ヒント: 音声準備中（キャッシュ再利用）...", flush=True)
         audio_path = ensure_audio(str(rv))
 
-        backend = resolve_diarizer_backend(args)
-        if backend == "pyannote":
-            from .diarization_v2 import diarize_audio, load_diarization_pipeline
-        else:
-            from .diarization_speakrs import diarize_audio, load_diarization_pipeline
-        num_speakers = args.speakers if args.speakers is not None else expected_speakers(context)
         print("話者ヒント: 話者識別中...", flush=True)
-        pipeline = load_diarization_pipeline()
-        diar = diarize_audio(audio_path, pipeline, num_speakers=num_speakers)
+        diar = run_diarization(resolve_diarizer_backend(args), audio_path, speaker_count_hint(args, context))
 
         from .voiceprint import cluster_similarity, identify, identify_segments
 
@@ -344,10 +448,7 @@ def main():
     if not args.video_path:
         parser.error("動画ファイルのパスを指定してください（または --watch で進行状況を監視）")
 
-    video_path = Path(args.video_path).resolve()
-    if not video_path.exists():
-        print(f"エラー: ファイルが見つかりません: {video_path}", file=sys.stderr)
-        sys.exit(1)
+    video_path = existing_video(args.video_path)
 
     output_path = args.output
     if output_path is None:
@@ -368,19 +469,7 @@ def main():
     # 案件コンテキスト（任意）: ASR固有名詞 + 文字起こし後の決定的正規化
     # --project <slug> 指定時は案件ストア(~/.claude/meeting-contexts/<slug>.yaml)を context として使い、
     # 同一slugの声紋プロファイルも既定で有効にする（声紋と案件ストアを slug で連結）。
-    context_path = args.context
-    voiceprint_profile = args.voiceprints
-    if args.project:
-        from .context_store import load_project, store_path
-
-        proj = load_project(args.project)
-        if proj is None:
-            print(f"    案件『{args.project}』はまだ未登録（初回として進めます）", flush=True)
-        else:
-            if not context_path:
-                context_path = str(store_path(args.project))
-            if not voiceprint_profile:
-                voiceprint_profile = proj.get("voiceprint_profile") or args.project
+    context_path, voiceprint_profile = resolve_project(args)
     context = load_context(context_path) if context_path else None
     glossary = asr_glossary(context) if context else None
 
@@ -393,39 +482,56 @@ def main():
         print(f"案件コンテキスト: {src}（固有名詞 {len(glossary)} 件）", flush=True)
     print(flush=True)
 
+    from .transcriber import transcribe_video
+
+    # 話者識別モデルのロード（import＋初期化で数秒〜数十秒）を文字起こしと並行して進める。
+    # どちらも重い処理は GIL を解放するネイティブ側なので、スレッド1本で十分重なる。
+    # daemon スレッドにするのは、文字起こしが失敗したときにロードの完了を待たずに終了するため
+    # （ThreadPoolExecutor のワーカーは実行中のタスクを終えるまでプロセス終了を止める）。
+    pipeline_future = None
+    if not args.no_diarization:
+        import threading
+        from concurrent.futures import Future
+
+        pipeline_future = Future()
+
+        def load_pipeline() -> None:
+            try:
+                pipeline_future.set_result(diarizer_module(backend).load_diarization_pipeline())
+            except BaseException as e:  # noqa: BLE001
+                pipeline_future.set_exception(e)
+
+        threading.Thread(target=load_pipeline, name="diarizer-loader", daemon=True).start()
+
     # Step 1: Transcribe
     print("1/3 音声抽出・文字起こし中...", flush=True)
-    whisper_result, audio_path = transcribe_video(str(video_path), args.model, max_accuracy, glossary)
+    # 単語時刻は話者割当の多数決と精度モードの無音幻聴除去にだけ使う。どちらも無ければ DTW を省く
+    word_timestamps = max_accuracy or not args.no_diarization
+    whisper_result, audio_path = transcribe_video(
+        str(video_path), args.model, max_accuracy, glossary, word_timestamps=word_timestamps
+    )
     print(f"    完了 ({len(whisper_result.get('segments', []))} セグメント)", flush=True)
 
-    # Import diarization module（backend に応じて。いずれも同じ3関数を提供）
-    if backend == "pyannote":
-        from .diarization_v2 import assign_speakers_to_segments, diarize_audio, load_diarization_pipeline
-    else:
-        from .diarization_speakrs import assign_speakers_to_segments, diarize_audio, load_diarization_pipeline
-
     # Step 2: Speaker diarization
     if args.no_diarization:
         print("2/3 話者識別: スキップ")
-        segments_with_speakers = [
-            {
-                "start": seg["start"],
-                "end": seg["end"],
-                "text": seg["text"].strip(),
-                "speaker": "発話者",
-            }
-            for seg in whisper_result.get("segments", [])
-        ]
+        whisper_segments = whisper_result.get("segments", [])
+        segments = (
+            [seg["start"] for seg in whisper_segments],
+            [seg["end"] for seg in whisper_segments],
+            ["発話者"] * len(whisper_segments),
+            [seg["text"].strip() for seg in whisper_segments],
+        )
     else:
-        # 話者数ヒント: --speakers 明示 > 案件コンテキスト(expected_speakers/roster件数)
-        num_speakers = args.speakers if args.speakers is not None else expected_speakers(context)
+        diarizer = diarizer_module(backend)
+        num_speakers = speaker_count_hint(args, context)
         print("2/3 話者識別中...", flush=True)
         if num_speakers:
             print(f"    話者数ヒント: {num_speakers}（過分割を抑制）", flush=True)
         print("    モデル読み込み中...", flush=True)
-        pipeline = load_diarization_pipeline()
+        pipeline = pipeline_future.result()
         print("    解析中...", flush=True)
-        diarization_segments = diarize_audio(audio_path, pipeline, num_speakers=num_speakers)
+        diarization_segments = diarizer.diarize_audio(audio_path, pipeline, num_speakers=num_speakers)
 
         # 声紋識別（任意）: --voiceprints/--project 指定時、diarizationクラスタを声紋DBと照合して実名化
         name_map = None
@@ -439,8 +545,10 @@ def main():
             except Exception as e:
                 print(f"    声紋識別スキップ（{type(e).__name__}: {str(e)[:80]}）", file=sys.stderr)
 
-        segments_with_speakers = assign_speakers_to_segments(whisper_result, diarization_segments, name_map=name_map)
-        unique_speakers = sorted(set(seg["speaker"] for seg in segments_with_speakers if seg["speaker"] != "不明"))
+        segments, speaker_labels = diarizer.assign_speakers_to_segments(
+            whisper_result, diarization_segments, name_map=name_map
+        )
+        unique_speakers = sorted(speaker_labels)
         print(f"    完了 (話者: {', '.join(unique_speakers)})", flush=True)
 
         # 話者同一性ヒント（柱2）: 1次結果は直さず、議事録(成果物)側で過分割/過少分割を正すための材料。
@@ -475,42 +583,9 @@ def main():
 
     # Step 3: Format and save
     print("3/3 テキスト生成中...", flush=True)
-    output_lines = []
-    current_speaker = None
-    current_text_parts = []
-    current_start = None
-
-    for segment in segments_with_speakers:
-        if segment["speaker"] != current_speaker:
-            if current_speaker is not None and current_text_parts:
-                timestamp = format_timestamp(current_start)
-                text = "".join(current_text_parts).strip()
-                output_lines.append(f"{current_speaker} ({timestamp})")
-                output_lines.append(text)
-                output_lines.append("")
-
-            current_speaker = segment["speaker"]
-            current_text_parts = [segment["text"]]
-            current_start = segment["start"]
-        else:
-            current_text_parts.append(segment["text"])
-
-    if current_speaker is not None and current_text_parts:
-        timestamp = format_timestamp(current_start)
-        text = "".join(current_text_parts).strip()
-        output_lines.append(f"{current_speaker} ({timestamp})")
-        output_lines.append(text)
-        output_lines.append("")
-
-    output_text = "\n".join(output_lines)
-
-    # 決定的(辞書)正規化: 曖昧さの無い表記ゆれのみ機械置換（文脈依存はClaude校正へ）
-    if context:
-        output_text, norm_report = apply_normalization(output_text, context)
-        if norm_report:
-            print(f"    正規化: {', '.join(norm_report)}", flush=True)
-
-    output_path.write_text(output_text, encoding="utf-8")
+    norm_report = write_transcript(segments, output_path, context)
+    if norm_report:
+        print(f"    正規化: {', '.join(norm_report)}", flush=True)
 
     print("    完了", flush=True)
     print(flush=True)
@@ -23,8 +23,9 @@ from pathlib import Path
 
 import torchaudio
 
-# 話者割当ては backend 非依存なので pyannote 版の実装を再利用する
-from .diarization_v2 import assign_speakers_to_segments  # noqa: F401
+# 話者割当て・波形デコードは backend 非依存なので pyannote 版の実装を再利用する
+from .diarization_v2 import assign_speakers_to_segments, load_waveform  # noqa: F401
+from .transcriber import is_16k_mono_wav
 
 # リポジトリ同梱バイナリの既定パス（src/meeting_transcriber/ から見て repo ルート）
 _DEFAULT_BIN = (
@@ -70,12 +71,8 @@ def load_diarization_pipeline() -> dict:
 
 def _to_16k_mono_wav(audio_path: str, dst: str) -> None:
     """任意の音声を 16kHz mono / 16-bit PCM WAV に整える（speakrs/hound が読む形式）。"""
-    waveform, sample_rate = torchaudio.load(audio_path)
-    if waveform.shape[0] > 1:
-        waveform = waveform.mean(dim=0, keepdim=True)
-    if sample_rate != 16000:
-        waveform = torchaudio.transforms.Resample(sample_rate, 16000)(waveform)
-    torchaudio.save(dst, waveform, 16000, encoding="PCM_S", bits_per_sample=16)
+    audio = load_waveform(audio_path)
+    torchaudio.save(dst, audio["waveform"], 16000, encoding="PCM_S", bits_per_sample=16)
 
 
 def _parse_rttm(rttm: str) -> list[dict]:
@@ -106,8 +103,11 @@ def diarize_audio(audio_path: str, pipeline: dict = None, num_speakers: int = No
         pipeline = load_diarization_pipeline()
 
     with tempfile.TemporaryDirectory() as tmp:
-        wav = str(Path(tmp) / "audio16k.wav")
-        _to_16k_mono_wav(audio_path, wav)
+        # 16kHz mono PCM ならそのまま渡す（デコード→再エンコード→一時ファイル書き出しを省く）
+        wav = str(audio_path)
+        if not is_16k_mono_wav(wav):
+            wav = str(Path(tmp) / "audio16k.wav")
+            _to_16k_mono_wav(audio_path, wav)
         proc = subprocess.run(
             [pipeline["binary"], wav, pipeline["mode"]],
             capture_output=True,
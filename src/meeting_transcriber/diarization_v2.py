@@ -5,8 +5,12 @@ speaker-diarization-community-1 を優先（取り違えが3.1比で大幅減・
 キャッシュ済みならオフラインでトークン無しロード可。
 """
 
+import math
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
+import numpy as np
 import torch
 import torchaudio
 from pyannote.audio import Pipeline
@@ -14,36 +18,145 @@ from pyannote.audio import Pipeline
 # Global pipeline instance (lazy loading)
 _pipeline = None
 
+# 直近にデコードした波形（1件だけ保持）。key=(path, mtime_ns)
+_waveform_cache: tuple[tuple[str, int], dict] | None = None
+
 # 優先順: community-1（高精度・商用可） -> 3.1（従来）
 _MODEL_CANDIDATES = [
     "pyannote/speaker-diarization-community-1",
     "pyannote/speaker-diarization-3.1",
 ]
 
+# チャンク分割時の重なり幅（秒）と、チャンク間で同一話者とみなす重心のコサイン類似度
+_CHUNK_OVERLAP_SEC = 10.0
+_STITCH_THRESHOLD = 0.7
+
 
 def _get_device() -> torch.device:
-    """既定はcpu（pyannote+MPSはタイムスタンプ崩れの報告があるため）。
-    MEETING_DIARIZER_DEVICE=mps で明示的にMPSを使う（検証扱い）。"""
-    want = os.environ.get("MEETING_DIARIZER_DEVICE", "cpu").lower()
-    if want == "mps" and torch.backends.mps.is_available():
+    """pyannote パイプラインの計算デバイス。既定 auto（CUDA > MPS > CPU）。
+
+    MPS のタイムスタンプ崩れは segmentation（フレーム単位の話者活性＝そのまま時刻になる）側の
+    問題なので、MPS 時は _pin_segmentation_to_cpu で segmentation だけ CPU に残し、処理時間の
+    大半を占める embedding を GPU で回す。MEETING_DIARIZER_DEVICE=cpu/mps/cuda/auto で上書き可。
+    """
+    want = os.environ.get("MEETING_DIARIZER_DEVICE", "auto").lower()
+    if want in ("auto", "cuda") and torch.cuda.is_available():
+        return torch.device("cuda")
+    if want in ("auto", "mps") and torch.backends.mps.is_available():
         return torch.device("mps")
     torch.set_num_threads(8)
     return torch.device("cpu")
 
 
+def _pin_segmentation_to_cpu(pipeline: Pipeline, device: torch.device) -> torch.device:
+    """MPS 時は segmentation 推論器だけ CPU に戻す（時刻精度優先）。embedding は GPU のまま。
+
+    戻せなかったとき（推論器が見つからない・移動に失敗）は MPS の segmentation で時刻が崩れるのを
+    避けて、パイプライン全体を CPU に戻す。実際に使うデバイスを返す。
+    """
+    if device.type != "mps":
+        return device
+    segmentation = getattr(pipeline, "_segmentation", None)
+    try:
+        if segmentation is None:
+            raise AttributeError("pipeline has no _segmentation")
+        segmentation.to(torch.device("cpu"))
+        return device
+    except Exception as e:  # noqa: BLE001
+        print(
+            f"    segmentation を CPU に固定できないため全体を CPU で実行（{type(e).__name__}: {str(e)[:80]}）",
+            flush=True,
+        )
+    cpu = torch.device("cpu")
+    pipeline.to(cpu)
+    return cpu
+
+
+def load_waveform(audio_path: str) -> dict:
+    """音声を 16kHz mono float32 の {'waveform','sample_rate'} へ1回だけデコードして返す。
+
+    pyannote の Pipeline / Inference.crop にファイルパスを渡すと、呼び出し（区間）ごとに
+    ファイルを開き直してデコード・リサンプルする。メモリ上の波形 dict を渡せばそれが無くなる。
+    diarization → 声紋embedding と同じ音声を続けて読むので、パス＋mtime が同じなら直近の
+    デコード結果を使い回す（長時間会議でも保持は1件だけ）。
+    """
+    global _waveform_cache
+    path = str(audio_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    if _waveform_cache is not None and _waveform_cache[0] == key:
+        return _waveform_cache[1]
+
+    waveform, sample_rate = torchaudio.load(path)
+    # 先に mono 化してからリサンプル（1chぶんの計算で済む）
+    if waveform.shape[0] > 1:
+        waveform = waveform.mean(dim=0, keepdim=True)
+    if sample_rate != 16000:
+        waveform = torchaudio.functional.resample(waveform, sample_rate, 16000)
+    audio = {"waveform": waveform.to(torch.float32).contiguous(), "sample_rate": 16000}
+    _waveform_cache = (key, audio)
+    return audio
+
+
+def _pipeline_cache_path(model_id: str) -> Path:
+    """初期化済みパイプラインのスナップショット保存先。pyannote/torch の版ごとに分ける。
+
+    既定 ~/.cache/meeting-transcriber/、MEETING_PIPELINE_CACHE_DIR で上書き可。
+    """
+    import pyannote.audio
+
+    base = Path(os.environ.get("MEETING_PIPELINE_CACHE_DIR", Path.home() / ".cache" / "meeting-transcriber"))
+    tag = f"{model_id.replace('/', '--')}-pyannote{pyannote.audio.__version__}-torch{torch.__version__}"
+    return base / f"{tag}.pt"
+
+
+def _load_cached_pipeline(model_id: str) -> Pipeline | None:
+    """保存済みスナップショットからパイプラインを復元する（無い・壊れていれば None）。
+
+    from_pretrained は毎回 config 解析・各モデルの構築・重みの読み込みをやり直す。初期化済みの
+    パイプラインを丸ごと torch.save しておき、mmap で読めば重みのコピー/展開も省ける。
+    自分で書いたローカルファイルなので weights_only=False で読む。
+    """
+    path = _pipeline_cache_path(model_id)
+    if not path.exists():
+        return None
+    try:
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=False)
+    except Exception:  # noqa: BLE001
+        # 版差・破損時は作り直す（from_pretrained 後に上書き保存される）
+        return None
+
+
+def _save_cached_pipeline(pipeline: Pipeline, model_id: str) -> None:
+    """初期化直後（CPU 上）のパイプラインを保存する。失敗しても本処理は止めない。"""
+    path = _pipeline_cache_path(model_id)
+    tmp = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(pipeline, tmp)
+        tmp.replace(path)
+    except Exception:  # noqa: BLE001
+        tmp.unlink(missing_ok=True)
+
+
 def load_diarization_pipeline() -> Pipeline:
-    """pyannote.audio の話者分離パイプラインをロードする。"""
+    """pyannote.audio の話者分離パイプラインをロードする（2回目以降はディスクのスナップショットから）。"""
     global _pipeline
     if _pipeline is None:
         token = os.environ.get("HF_TOKEN") or os.environ.get("HUGGINGFACE_TOKEN")
         errors = []
+        device = _get_device()
         for model_id in _MODEL_CANDIDATES:
             try:
-                # token=None でもキャッシュ済みならロード可（オフライン）
-                _pipeline = Pipeline.from_pretrained(model_id, token=token)
+                _pipeline = _load_cached_pipeline(model_id)
+                if _pipeline is None:
+                    # token=None でもキャッシュ済みならロード可（オフライン）
+                    _pipeline = Pipeline.from_pretrained(model_id, token=token)
+                    if _pipeline is not None:
+                        _save_cached_pipeline(_pipeline, model_id)
                 if _pipeline is not None:
-                    _pipeline.to(_get_device())
-                    print(f"    話者識別モデル: {model_id} / デバイス: {_get_device()}", flush=True)
+                    _pipeline.to(device)
+                    device = _pin_segmentation_to_cpu(_pipeline, device)
+                    print(f"    話者識別モデル: {model_id} / デバイス: {device}", flush=True)
                     return _pipeline
             except Exception as e:  # noqa: BLE001
                 errors.append(f"{model_id}: {type(e).__name__}: {str(e)[:120]}")
@@ -55,8 +168,171 @@ def load_diarization_pipeline() -> Pipeline:
     return _pipeline
 
 
+def _chunk_bounds(duration: float, chunk_sec: float, overlap_sec: float) -> list[tuple[float, float, float, float]]:
+    """分割区間 [(切り出し開始, 切り出し終了, 担当開始, 担当終了)] を返す（秒）。
+
+    隣接チャンクは overlap_sec 重なり、担当区間は重なりの中点で切り替える（隙間・重複なし）。
+    """
+    step = chunk_sec - overlap_sec
+    bounds = []
+    start = 0.0
+    while True:
+        end = min(start + chunk_sec, duration)
+        last = end >= duration
+        own_start = 0.0 if not bounds else start + overlap_sec / 2
+        own_end = duration if last else end - overlap_sec / 2
+        bounds.append((start, end, own_start, own_end))
+        if last:
+            return bounds
+        start += step
+
+
+def _run_with_embeddings(pipeline: Pipeline, audio: dict, params: dict) -> tuple[list[dict], dict | None]:
+    """パイプラインを実行し、(セグメント, {ラベル: 話者重心embedding}) を返す。"""
+    try:
+        result = pipeline(audio, return_embeddings=True, **params)
+    except TypeError:
+        result = pipeline(audio, **params)
+
+    # 3.x は (Annotation, embeddings)、4.x は DiarizeOutput.speaker_embeddings
+    if isinstance(result, tuple):
+        annotation, embeddings = result
+    else:
+        annotation = getattr(result, "speaker_diarization", result)
+        embeddings = getattr(result, "speaker_embeddings", None)
+
+    segments = [
+        {"start": turn.start, "end": turn.end, "speaker": speaker}
+        for turn, _, speaker in annotation.itertracks(yield_label=True)
+    ]
+    if embeddings is None:
+        return segments, None
+    return segments, {label: np.asarray(embeddings[i], dtype=np.float64) for i, label in enumerate(annotation.labels())}
+
+
+def _match_chunk_speakers(centroids: dict, global_centroids: list[np.ndarray], counts: list[int]) -> dict[str, str]:
+    """チャンク内ラベルを全体ラベルへ対応付ける（コサイン類似度の高い順に1対1・閾値未満は新規話者）。
+
+    global_centroids / counts はその場で更新する（重心はチャンク数で平均）。
+    """
+    labels = list(centroids)
+    local = np.stack([centroids[label] for label in labels]) if labels else np.empty((0, 0))
+    local = local / np.maximum(np.linalg.norm(local, axis=1, keepdims=True), 1e-12)
+
+    pairs = []
+    if global_centroids and labels:
+        known = np.stack(global_centroids)
+        known = known / np.maximum(np.linalg.norm(known, axis=1, keepdims=True), 1e-12)
+        sims = local @ known.T
+        pairs = sorted(((sims[i, j], i, j) for i in range(len(labels)) for j in range(len(known))), reverse=True)
+
+    assigned: dict[int, int] = {}
+    taken: set[int] = set()
+    for sim, i, j in pairs:
+        if sim < _STITCH_THRESHOLD:
+            break
+        if i in assigned or j in taken:
+            continue
+        assigned[i] = j
+        taken.add(j)
+
+    mapping = {}
+    for i, label in enumerate(labels):
+        j = assigned.get(i)
+        if j is None:
+            j = len(global_centroids)
+            global_centroids.append(local[i])
+            counts.append(1)
+        else:
+            counts[j] += 1
+            global_centroids[j] = global_centroids[j] + (local[i] - global_centroids[j]) / counts[j]
+        mapping[label] = f"SPEAKER_{j:02d}"
+    return mapping
+
+
+def _chunk_seconds() -> float:
+    """MEETING_DIARIZER_CHUNK_SEC を読む（0・未設定は無効）。
+
+    速度用の任意設定なので、数値でない・負・重なり幅以下などの不正値は警告を出して無効（0）にし、
+    話者分離自体は全体一括で続ける。
+    """
+    raw = os.environ.get("MEETING_DIARIZER_CHUNK_SEC", "").strip()
+    if not raw:
+        return 0.0
+    try:
+        chunk_sec = float(raw)
+    except ValueError:
+        chunk_sec = math.nan
+    if chunk_sec == 0.0:
+        return 0.0
+    if not math.isfinite(chunk_sec) or chunk_sec <= _CHUNK_OVERLAP_SEC:
+        print(
+            f"    MEETING_DIARIZER_CHUNK_SEC={raw!r} は無効（{_CHUNK_OVERLAP_SEC:g}秒より大きい秒数を指定）。"
+            "チャンク分割せずに実行",
+            flush=True,
+        )
+        return 0.0
+    return chunk_sec
+
+
+def _chunk_workers(pipeline: Pipeline) -> int:
+    """チャンクを並列に回すスレッド数（MEETING_DIARIZER_CHUNK_WORKERS で上書き）。
+
+    1つのパイプラインを複数スレッドから同時に呼ぶので、既定で並列にするのはスレッド安全な
+    CPU / CUDA のときだけ。MPS バックエンドはスレッド安全でないため既定は1（逐次）。
+    """
+    env = os.environ.get("MEETING_DIARIZER_CHUNK_WORKERS", "").strip()
+    if env:
+        try:
+            return max(1, int(env))
+        except ValueError:
+            print(f"    MEETING_DIARIZER_CHUNK_WORKERS={env!r} は無効（整数を指定）。既定値で実行", flush=True)
+    device = getattr(pipeline, "device", None)
+    return 2 if getattr(device, "type", None) in ("cpu", "cuda") else 1
+
+
+def _diarize_chunked(pipeline: Pipeline, audio: dict, params: dict, chunk_sec: float) -> list[dict] | None:
+    """長時間音声をチャンク分割して並列に話者分離し、話者重心の照合でラベルを繋ぐ。
+
+    embedding を返さないパイプラインでは繋げないので None（呼び出し側で全体一括に戻す）。
+    """
+    waveform, sr = audio["waveform"], audio["sample_rate"]
+    bounds = _chunk_bounds(waveform.shape[-1] / sr, chunk_sec, _CHUNK_OVERLAP_SEC)
+
+    # チャンクには全員が出るとは限らないので、人数指定は上限として渡す
+    chunk_params = {"max_speakers": params["num_speakers"]} if "num_speakers" in params else {}
+
+    def run(bound: tuple[float, float, float, float]) -> tuple[list[dict], dict | None]:
+        start, end, _, _ = bound
+        chunk = {"waveform": waveform[:, int(start * sr) : int(end * sr)], "sample_rate": sr}
+        return _run_with_embeddings(pipeline, chunk, chunk_params)
+
+    with ThreadPoolExecutor(max_workers=_chunk_workers(pipeline)) as pool:
+        outputs = list(pool.map(run, bounds))
+
+    global_centroids: list[np.ndarray] = []
+    counts: list[int] = []
+    merged = []
+    for (start, _, own_start, own_end), (segments, centroids) in zip(bounds, outputs, strict=True):
+        if centroids is None:
+            return None
+        mapping = _match_chunk_speakers(centroids, global_centroids, counts)
+        for seg in segments:
+            seg_start = max(seg["start"] + start, own_start)
+            seg_end = min(seg["end"] + start, own_end)
+            if seg_end > seg_start:
+                merged.append({"start": seg_start, "end": seg_end, "speaker": mapping[seg["speaker"]]})
+
+    merged.sort(key=lambda seg: seg["start"])
+    return merged
+
+
 def diarize_audio(audio_path: str, pipeline: Pipeline = None, num_speakers: int = None) -> list[dict]:
-    """話者分離を実行し [{'start','end','speaker'}] を返す。"""
+    """話者分離を実行し [{'start','end','speaker'}] を返す。
+
+    MEETING_DIARIZER_CHUNK_SEC（秒・既定0=無効）を指定すると、それより長い音声は
+    チャンク分割して並列処理する（_diarize_chunked）。
+    """
     if pipeline is None:
         pipeline = load_diarization_pipeline()
 
@@ -64,16 +340,16 @@ def diarize_audio(audio_path: str, pipeline: Pipeline = None, num_speakers: int
     if num_speakers is not None:
         params["num_speakers"] = num_speakers
 
-    # 16kHz mono に整える（pyannoteの期待形式）
-    waveform, sample_rate = torchaudio.load(audio_path)
-    if sample_rate != 16000:
-        waveform = torchaudio.transforms.Resample(sample_rate, 16000)(waveform)
-        sample_rate = 16000
-    if waveform.shape[0] > 1:
-        waveform = waveform.mean(dim=0, keepdim=True)
-    audio_input = {"waveform": waveform, "sample_rate": sample_rate}
+    # 16kHz mono の波形 dict で渡す（pyannoteの期待形式・ファイル再読込なし）
+    audio = load_waveform(audio_path)
 
-    result = pipeline(audio_input, **params)
+    chunk_sec = _chunk_seconds()
+    if chunk_sec and audio["waveform"].shape[-1] / audio["sample_rate"] > chunk_sec:
+        segments = _diarize_chunked(pipeline, audio, params, chunk_sec)
+        if segments is not None:
+            return segments
+
+    result = pipeline(audio, **params)
 
     # pyannote 4.x は DiarizeOutput、3.x は Annotation を返す
     annotation = getattr(result, "speaker_diarization", result)
@@ -84,80 +360,117 @@ def diarize_audio(audio_path: str, pipeline: Pipeline = None, num_speakers: int
     ]
 
 
-def _speaker_at(t: float, diarization_segments: list[dict]) -> str | None:
-    """時刻 t を含む（最も近い）diarizationセグメントの話者を返す。"""
-    for d in diarization_segments:
-        if d["start"] <= t <= d["end"]:
-            return d["speaker"]
-    # 含むものが無ければ最も近いセグメント
-    best, best_dist = None, None
-    for d in diarization_segments:
-        dist = 0 if d["start"] <= t <= d["end"] else min(abs(t - d["start"]), abs(t - d["end"]))
-        if best_dist is None or dist < best_dist:
-            best, best_dist = d["speaker"], dist
-    return best
+def _diar_arrays(diarization_segments: list[dict]) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[str]]:
+    """diarizationセグメントを start 昇順の並列配列 (starts, ends, max_ends, speakers) へ。
+
+    max_ends は ends の累積最大（単調非減少）。発話が重なって ends が非単調でも、これに
+    二分探索すれば「時刻 t 以降まで続く最初の区間」を O(log M) で引ける。
+    """
+    turns = sorted(diarization_segments, key=lambda d: d["start"])
+    starts = np.fromiter((d["start"] for d in turns), dtype=float, count=len(turns))
+    ends = np.fromiter((d["end"] for d in turns), dtype=float, count=len(turns))
+    max_ends = np.maximum.accumulate(ends) if len(turns) else ends
+    return starts, ends, max_ends, [d["speaker"] for d in turns]
+
+
+def _turns_at(ts: np.ndarray, starts: np.ndarray, max_ends: np.ndarray) -> np.ndarray:
+    """各時刻を含む（無ければ最も近い）diarizationセグメントの添字を二分探索で一括して返す。
+
+    優先順は「最初に含む区間 → 無ければ最も近い区間（同距離なら先の区間）」。
+    - 含む区間: start<=t の最後の添字 last までに、max_ends が初めて t 以上になる添字 first があればそれ。
+    - 含まない: 左は end 最大の区間（距離 t-max_ends[last]）、右は次の区間（距離 starts[last+1]-t）。
+    """
+    n = len(starts)
+    last = np.searchsorted(starts, ts, side="right") - 1
+    first = np.searchsorted(max_ends, ts, side="left")
+    contained = first <= last
+
+    has_left = last >= 0
+    left_end = max_ends[np.maximum(last, 0)]
+    left = np.searchsorted(max_ends, left_end, side="left")
+    right = np.minimum(last + 1, n - 1)
+    has_right = last + 1 < n
+    dist_left = np.where(has_left, ts - left_end, np.inf)
+    dist_right = np.where(has_right, starts[right] - ts, np.inf)
+    nearest = np.where(dist_left <= dist_right, left, right)
+    return np.where(contained, first, nearest)
 
 
 def assign_speakers_to_segments(
     whisper_result: dict,
     diarization_segments: list[dict],
     name_map: dict[str, str] | None = None,
-) -> list[dict]:
-    """Whisperセグメントへ話者を割当てる。
+) -> tuple[tuple[np.ndarray, np.ndarray, list[str], list[str]], list[str]]:
+    """Whisperセグメントへ話者を割当て、((starts, ends, speakers, texts), 登場した話者ラベル[初出順]) を返す。
+
+    セグメントは列ごとの配列（SoA）で返す。1件ごとの dict を作らないので長時間会議でも軽い。
 
     word単位の中点投票（多数決）で話者を決める。これにより1セグメントに
     質問→相槌→受け が混ざるケースの話者取り違えを軽減する。
     word情報が無い場合はセグメント中点で割当てる（従来方式へフォールバック）。
+    区間照合は start 昇順配列への二分探索で行い、セグメント×diarization の線形走査を避ける。
 
     name_map（声紋識別の結果 {'発話者1':'山田',...}）が渡された話者は『発話者N』の
     代わりに実名を表示する。未識別(None)や未指定はそのまま『発話者N』。
     """
-    result_segments = []
+    whisper_segments = whisper_result.get("segments", [])
+    seg_starts = np.fromiter((seg["start"] for seg in whisper_segments), dtype=np.float64, count=len(whisper_segments))
+    seg_ends = np.fromiter((seg["end"] for seg in whisper_segments), dtype=np.float64, count=len(whisper_segments))
+    seg_speakers: list[str] = []
+    seg_texts: list[str] = []
+    # 登場した話者ラベル（dict で重複排除しつつ初出順を保つ）。呼び出し側で再走査しないで済む
+    used_labels: dict[str, None] = {}
+
+    starts, ends, max_ends, speakers = _diar_arrays(diarization_segments)
+    has_turns = bool(speakers)
 
-    unique_speakers = sorted(set(seg["speaker"] for seg in diarization_segments))
+    # 採番は生ラベル昇順（voiceprint._label_to_cluster と同じ規則。初出順にすると声紋と対応がズレる）
     speaker_map = {}
-    for i, spk in enumerate(unique_speakers):
+    for i, spk in enumerate(sorted(set(speakers))):
         label = f"発話者{i + 1}"
         speaker_map[spk] = (name_map.get(label) or label) if name_map else label
 
-    for segment in whisper_result.get("segments", []):
+    for segment in whisper_segments:
         seg_start = segment["start"]
         seg_end = segment["end"]
 
-        words = segment.get("words") or []
+        words = [
+            (w["start"], w["end"])
+            for w in segment.get("words") or []
+            if w.get("start") is not None and w.get("end") is not None
+        ]
         votes: dict[str, float] = {}
-        for w in words:
-            ws, we = w.get("start"), w.get("end")
-            if ws is None or we is None:
-                continue
-            mid = (ws + we) / 2
-            spk = _speaker_at(mid, diarization_segments)
-            if spk is not None:
-                # 単語長で重み付け（長い単語ほど話者の手掛かりが強い）
-                votes[spk] = votes.get(spk, 0.0) + max(0.01, we - ws)
+        if words and has_turns:
+            spans = np.asarray(words, dtype=float)
+            turns = _turns_at((spans[:, 0] + spans[:, 1]) / 2, starts, max_ends)
+            # 単語長で重み付け（長い単語ほど話者の手掛かりが強い）
+            weights = np.maximum(0.01, spans[:, 1] - spans[:, 0])
+            for idx, w in zip(turns.tolist(), weights.tolist(), strict=True):
+                spk = speakers[idx]
+                votes[spk] = votes.get(spk, 0.0) + w
 
+        best_speaker = None
         if votes:
             best_speaker = max(votes, key=votes.get)
-        else:
+        elif has_turns:
             # フォールバック: 最大オーバーラップ → セグメント中点
-            best_speaker, best_overlap = None, 0.0
-            for d in diarization_segments:
-                overlap = max(0.0, min(seg_end, d["end"]) - max(seg_start, d["start"]))
-                if overlap > best_overlap:
-                    best_overlap, best_speaker = overlap, d["speaker"]
-            if best_speaker is None:
-                best_speaker = _speaker_at((seg_start + seg_end) / 2, diarization_segments)
-
-        speaker_label = speaker_map.get(best_speaker, "不明") if best_speaker else "不明"
-
-        result_segments.append(
-            {
-                "start": seg_start,
-                "end": seg_end,
-                "text": segment["text"].strip(),
-                "speaker": speaker_label,
-                "original_speaker_id": best_speaker,
-            }
-        )
+            # 重なり得るのは start<seg_end かつ end>seg_start の区間だけなので、その窓だけ計算する
+            lo = int(np.searchsorted(max_ends, seg_start, side="right"))
+            hi = int(np.searchsorted(starts, seg_end, side="left"))
+            overlap = np.maximum(0.0, np.minimum(seg_end, ends[lo:hi]) - np.maximum(seg_start, starts[lo:hi]))
+            if overlap.size and overlap.max() > 0.0:
+                best_speaker = speakers[lo + int(overlap.argmax())]
+            else:
+                mid = np.array([(seg_start + seg_end) / 2])
+                best_speaker = speakers[int(_turns_at(mid, starts, max_ends)[0])]
+
+        if best_speaker is None:
+            speaker_label = "不明"
+        else:
+            speaker_label = speaker_map[best_speaker]
+            used_labels[speaker_label] = None
+
+        seg_speakers.append(speaker_label)
+        seg_texts.append(segment["text"].strip())
 
-    return result_segments
+    return (seg_starts, seg_ends, seg_speakers, seg_texts), list(used_labels)
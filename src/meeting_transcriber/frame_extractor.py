@@ -1,12 +1,50 @@
 """Video frame extraction module."""
 
-from concurrent.futures import ThreadPoolExecutor
+import atexit
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import cv2
+import objc
 import Quartz
 import Vision
 
+# ワーカースレッドごとに使い回す VNRecognizeTextRequest（request はスレッド間で共有しない）
+_local = threading.local()
+
+# 前方への移動がこの秒数以内ならシークせず grab で読み進める（おおむね1 GOP）
+_GRAB_WINDOW_SEC = 10
+
+# 開いたままにしておく FrameExtractor の本数（LRU）
+_EXTRACTOR_CACHE_SIZE = 4
+_extractors: OrderedDict[tuple[str, int], "FrameExtractor"] = OrderedDict()
+_extractors_lock = threading.Lock()
+
+
+def _text_request():
+    """このスレッド用の設定済み VNRecognizeTextRequest を返す（初回だけ生成）。"""
+    request = getattr(_local, "request", None)
+    if request is None:
+        request = Vision.VNRecognizeTextRequest.alloc().init()
+        request.setRecognitionLevel_(Vision.VNRequestTextRecognitionLevelAccurate)
+        request.setRecognitionLanguages_(["ja", "en"])
+        request.setUsesLanguageCorrection_(True)
+        _local.request = request
+    return request
+
+
+def _ocr_cg_image(cg_image) -> list[str]:
+    """CGImage を Vision でOCRする。"""
+    request = _text_request()
+    handler = Vision.VNImageRequestHandler.alloc().initWithCGImage_options_(cg_image, None)
+    success = handler.performRequests_error_([request], None)
+    if not success:
+        return []
+    return [observation.topCandidates_(1)[0].string() for observation in request.results() or []]
+
 
 def ocr_image(image_path: str) -> list[str]:
     """
@@ -18,38 +56,187 @@ def ocr_image(image_path: str) -> list[str]:
     Returns:
         List of recognized text strings
     """
-    # Load image
-    image_url = Quartz.CFURLCreateWithFileSystemPath(None, image_path, Quartz.kCFURLPOSIXPathStyle, False)
-    image_source = Quartz.CGImageSourceCreateWithURL(image_url, None)
-    if not image_source:
-        return []
+    # 1枚ごとに autorelease pool を閉じる（並列・大量実行で Objective-C オブジェクトを溜めない）
+    with objc.autorelease_pool():
+        image_url = Quartz.CFURLCreateWithFileSystemPath(None, image_path, Quartz.kCFURLPOSIXPathStyle, False)
+        image_source = Quartz.CGImageSourceCreateWithURL(image_url, None)
+        if not image_source:
+            return []
+        cg_image = Quartz.CGImageSourceCreateImageAtIndex(image_source, 0, None)
+        del image_source, image_url
+        if not cg_image:
+            return []
+        texts = _ocr_cg_image(cg_image)
+        del cg_image
+        return texts
+
+
+def _cg_image_from_frame(frame):
+    """OpenCV の BGR フレーム(numpy)から CGImage を作る（JPEG エンコード/デコードを挟まない）。"""
+    rgba = cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA)
+    height, width = rgba.shape[:2]
+    data = Quartz.CFDataCreate(None, rgba.tobytes(), rgba.nbytes)
+    provider = Quartz.CGDataProviderCreateWithCFData(data)
+    color_space = Quartz.CGColorSpaceCreateDeviceRGB()
+    return Quartz.CGImageCreate(
+        width,
+        height,
+        8,
+        32,
+        width * 4,
+        color_space,
+        Quartz.kCGImageAlphaNoneSkipLast,
+        provider,
+        None,
+        False,
+        Quartz.kCGRenderingIntentDefault,
+    )
+
+
+def ocr_frame(frame) -> list[str]:
+    """デコード済みフレーム(BGR numpy)をメモリ上のまま OCR する。
+
+    保存した JPEG を読み直して OCR すると、JPEG のエンコード→デコード→ファイル読込を
+    余計に払う。フレームから直接 CGImage を作って Vision に渡す。
+    """
+    with objc.autorelease_pool():
+        cg_image = _cg_image_from_frame(frame)
+        if not cg_image:
+            return []
+        texts = _ocr_cg_image(cg_image)
+        del cg_image
+        return texts
+
+
+def _frame_paths(video_path: Path, timestamp_seconds: float, output_dir: str | None) -> tuple[Path, Path | None]:
+    """フレーム画像と OCR テキストの保存先を返す（output_dir 指定時は frames/ 配下、未指定は /tmp で OCR 保存なし）。"""
+    timestamp_str = f"{int(timestamp_seconds):05d}"
+    if output_dir is not None:
+        # Organized output: create frames/ subdirectory
+        frames_dir = Path(output_dir) / "frames"
+        frames_dir.mkdir(parents=True, exist_ok=True)
+        return frames_dir / f"frame_{timestamp_str}s.jpg", frames_dir / f"frame_{timestamp_str}s_ocr.txt"
+    # Temporary output
+    return Path("/tmp") / f"{video_path.stem}_frame_{timestamp_str}s.jpg", None
 
-    cg_image = Quartz.CGImageSourceCreateImageAtIndex(image_source, 0, None)
-    if not cg_image:
-        return []
 
-    # Create text recognition request
-    request = Vision.VNRecognizeTextRequest.alloc().init()
-    request.setRecognitionLevel_(Vision.VNRequestTextRecognitionLevelAccurate)
-    request.setRecognitionLanguages_(["ja", "en"])
-    request.setUsesLanguageCorrection_(True)
+class FrameExtractor:
+    """1本の動画を開いたまま、複数時刻のフレーム抽出＋OCRを繰り返す。
 
-    # Process image
-    handler = Vision.VNImageRequestHandler.alloc().initWithCGImage_options_(cg_image, None)
-    success = handler.performRequests_error_([request], None)
+    VideoCapture の生成は moov 解析・デコーダ初期化を伴い重い。同じ動画から何枚も取るときは
+    1回だけ開き、以降はフレーム番号シーク（cap.set）だけで済ませる。直前に読んだ位置から少し先
+    （_GRAB_WINDOW_SEC 以内）ならシークもせず grab で読み進める。OCR の
+    VNRecognizeTextRequest もスレッドごとに使い回す（_text_request）。
 
-    if not success:
-        return []
+        with FrameExtractor(video_path) as extractor:
+            image_path, texts, ocr_path = extractor.frame_at(120.0, output_dir)
+    """
+
+    def __init__(self, video_path: str):
+        self.video_path = Path(video_path)
+        if not self.video_path.exists():
+            raise FileNotFoundError(f"Video file not found: {self.video_path}")
+        self._cap = cv2.VideoCapture(str(self.video_path))
+        if not self._cap.isOpened():
+            raise ValueError(f"Could not open video file: {self.video_path}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS)
+        self.total_frames = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.duration = self.total_frames / self.fps if self.fps > 0 else 0
+        # 同一 capture へのシーク＋デコードは直列化する（MCPハンドラが別スレッドから呼ぶ場合に備える）
+        self._lock = threading.Lock()
+        # 直近にデコードしたフレーム番号（-1 = 未デコード／位置不明）
+        self._last_index = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._cap.release()
+
+    def read(self, timestamp_seconds: float):
+        """指定時刻のフレームを BGR numpy で返す。範囲外・デコード失敗は None。"""
+        if timestamp_seconds < 0 or (self.duration and timestamp_seconds > self.duration):
+            return None
+        target = int(timestamp_seconds * self.fps)
+        with self._lock:
+            if not self._cap.isOpened():
+                # get_extractor の LRU 追い出し・差し替えで、別スレッドが使用中のまま close された。
+                # 開き直して続行する（キャッシュ外になった capture は参照が切れた時点で解放される）
+                self._cap = cv2.VideoCapture(str(self.video_path))
+                self._last_index = -1
+            ahead = target - self._last_index
+            if self._last_index >= 0 and 0 < ahead <= self.fps * _GRAB_WINDOW_SEC:
+                # 近い前方移動: cap.set はデコーダをフラッシュしてキーフレームから読み直すので使わない。
+                # 間のフレームは grab（BGR 変換なし）で読み飛ばし、目的のフレームだけ retrieve する
+                for _ in range(ahead - 1):
+                    if not self._cap.grab():
+                        break
+                ret, frame = self._cap.retrieve() if self._cap.grab() else (False, None)
+            else:
+                self._cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                ret, frame = self._cap.read()
+            self._last_index = target if ret else -1
+        return frame if ret else None
+
+    def frame_at(self, timestamp_seconds: float, output_dir: str | None = None) -> tuple[str, list[str], str | None]:
+        """指定時刻のフレームを JPEG 保存して OCR し、extract_frame と同じ形で返す。"""
+        if timestamp_seconds < 0 or (self.duration and timestamp_seconds > self.duration):
+            raise ValueError(f"Timestamp {timestamp_seconds}s is out of range (0-{self.duration:.1f}s)")
+        frame = self.read(timestamp_seconds)
+        if frame is None:
+            raise ValueError(f"Could not read frame at {timestamp_seconds}s")
+
+        output_path, ocr_path = _frame_paths(self.video_path, timestamp_seconds, output_dir)
+
+        # Save as high-quality JPEG (no resize)
+        cv2.imwrite(str(output_path), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+        # Perform OCR on the decoded frame (no JPEG round-trip)
+        texts = ocr_frame(frame)
+
+        # Save OCR text if organized output
+        if ocr_path is not None and texts:
+            ocr_path.write_text("\n".join(texts), encoding="utf-8")
+
+        return str(output_path), texts, str(ocr_path) if ocr_path else None
 
-    # Extract results
-    texts = []
-    results = request.results()
-    if results:
-        for observation in results:
-            text = observation.topCandidates_(1)[0].string()
-            texts.append(text)
 
-    return texts
+def get_extractor(video_path: str) -> FrameExtractor:
+    """動画ごとに開いたままの FrameExtractor を返す（LRU で最大 _EXTRACTOR_CACHE_SIZE 本）。
+
+    MCP サーバーは同じ動画に対して何度もフレーム抽出を呼ぶので、capture とデコード位置を
+    呼び出しをまたいで保持する。キーは (絶対パス, mtime) で、動画が差し替われば開き直す。
+    追い出した extractor を他スレッドがまだ使っていても、read が capture を開き直すので失敗しない。
+    """
+    path = Path(video_path).resolve()
+    if not path.exists():
+        raise FileNotFoundError(f"Video file not found: {path}")
+    key = (str(path), path.stat().st_mtime_ns)
+    with _extractors_lock:
+        extractor = _extractors.get(key)
+        if extractor is not None:
+            _extractors.move_to_end(key)
+            return extractor
+        # 同じパスの古い版（動画が差し替えられた）は即座に閉じる
+        for stale in [k for k in _extractors if k[0] == key[0]]:
+            _extractors.pop(stale).close()
+        extractor = FrameExtractor(str(path))
+        _extractors[key] = extractor
+        while len(_extractors) > _EXTRACTOR_CACHE_SIZE:
+            _, evicted = _extractors.popitem(last=False)
+            evicted.close()
+    return extractor
+
+
+@atexit.register
+def _release_extractors() -> None:
+    with _extractors_lock:
+        while _extractors:
+            _extractors.popitem()[1].close()
 
 
 def extract_frame(
@@ -61,6 +248,8 @@ def extract_frame(
     Extract a frame from video at specified timestamp and save as JPEG.
     Also performs OCR on the frame.
 
+    capture は get_extractor で動画ごとに開いたまま使い回す。
+
     Args:
         video_path: Path to video file
         timestamp_seconds: Time in seconds to extract frame
@@ -70,145 +259,58 @@ def extract_frame(
     Returns:
         Tuple of (path to saved JPEG image, list of OCR texts, path to OCR text file or None)
     """
-    video_path = Path(video_path)
-    if not video_path.exists():
-        raise FileNotFoundError(f"Video file not found: {video_path}")
-
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video file: {video_path}")
-
-    try:
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps if fps > 0 else 0
-
-        if timestamp_seconds < 0 or timestamp_seconds > duration:
-            raise ValueError(f"Timestamp {timestamp_seconds}s is out of range (0-{duration:.1f}s)")
-
-        # Seek to frame
-        frame_number = int(timestamp_seconds * fps)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-
-        ret, frame = cap.read()
-        if not ret:
-            raise ValueError(f"Could not read frame at {timestamp_seconds}s")
-
-        # Determine output path
-        timestamp_str = f"{int(timestamp_seconds):05d}"
-        if output_dir is not None:
-            # Organized output: create frames/ subdirectory
-            frames_dir = Path(output_dir) / "frames"
-            frames_dir.mkdir(parents=True, exist_ok=True)
-            output_path = frames_dir / f"frame_{timestamp_str}s.jpg"
-            ocr_path = frames_dir / f"frame_{timestamp_str}s_ocr.txt"
-        else:
-            # Temporary output
-            output_path = Path("/tmp") / f"{video_path.stem}_frame_{timestamp_str}s.jpg"
-            ocr_path = None
-
-        # Save as high-quality JPEG (no resize)
-        cv2.imwrite(str(output_path), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-
-        # Perform OCR
-        texts = ocr_image(str(output_path))
-
-        # Save OCR text if organized output
-        if ocr_path is not None and texts:
-            ocr_path.write_text("\n".join(texts), encoding="utf-8")
-
-        return str(output_path), texts, str(ocr_path) if ocr_path else None
-
-    finally:
-        cap.release()
+    return get_extractor(video_path).frame_at(timestamp_seconds, output_dir)
 
 
 def extract_frames(
     video_path: str,
     timestamps: list[float],
     output_dir: str | None = None,
-    max_ocr_workers: int = 6,
+    max_ocr_workers: int | None = None,
 ) -> list[dict]:
     """複数タイムスタンプのフレームを動画1回オープンで抽出し、OCRを並列実行する。
 
     1枚ずつ extract_frame を呼ぶと毎回 VideoCapture を開き直し＋OCRを逐次実行するため、
     枚数に比例して遅い。ここでは動画を1回だけ開いて全フレームを連続デコードし、重い
-    Vision OCR をスレッドプールで並列化する（OCRはGILを解放するブロッキング呼び出しなので
-    並列が効く）。フレーム抽出が「文字起こし後」工程の主要コストなので効果が大きい。
+    Vision OCR をデコード済みフレームのままスレッドプールで並列実行する（OCRはGILを解放する
+    ブロッキング呼び出しなので並列が効く。max_ocr_workers 省略時は CPU コア数）。フレーム抽出が
+    「文字起こし後」工程の主要コストなので効果が大きい。
 
     戻り値: [{timestamp, image_path, ocr_path, ocr_texts}], timestamp昇順。
     """
-    video = Path(video_path)
-    if not video.exists():
-        raise FileNotFoundError(f"Video file not found: {video}")
-
-    cap = cv2.VideoCapture(str(video))
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video file: {video}")
-
-    if output_dir is not None:
-        frames_dir = Path(output_dir) / "frames"
-        frames_dir.mkdir(parents=True, exist_ok=True)
-    else:
-        frames_dir = Path("/tmp")
-
-    saved: list[dict] = []
-    try:
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps if fps > 0 else 0
-
+    ts_list = sorted(set(float(t) for t in timestamps))
+    workers = max(1, min(max_ocr_workers or os.cpu_count() or 1, len(ts_list) or 1))
+    saved: list[tuple[dict, Future]] = []
+    # デコードしながら OCR をプールへ投げる（フレームはメモリ上のまま渡し、デコードとOCRを重ねる）。
+    # 未処理のフレームを溜め込むと 4K で1枚 25MB がそのまま積み上がるので、投入中の枚数を
+    # ワーカー数の2倍までに抑える（OCR が終わればフレームは解放される）
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    extractor = get_extractor(video_path)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
         # 前方シークは速いので昇順に処理する
-        for ts in sorted(set(float(t) for t in timestamps)):
-            if ts < 0 or (duration and ts > duration):
-                continue
-            cap.set(cv2.CAP_PROP_POS_FRAMES, int(ts * fps))
-            ret, frame = cap.read()
-            if not ret:
+        for ts in ts_list:
+            frame = extractor.read(ts)
+            if frame is None:
                 continue
-            ts_str = f"{int(ts):05d}"
-            if output_dir is not None:
-                img_path = frames_dir / f"frame_{ts_str}s.jpg"
-                ocr_path = frames_dir / f"frame_{ts_str}s_ocr.txt"
-            else:
-                img_path = frames_dir / f"{video.stem}_frame_{ts_str}s.jpg"
-                ocr_path = None
+            img_path, ocr_path = _frame_paths(extractor.video_path, ts, output_dir)
             cv2.imwrite(str(img_path), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-            saved.append({"timestamp": ts, "image_path": str(img_path), "ocr_path": ocr_path})
-    finally:
-        cap.release()
-
-    # OCR を並列実行（Vision はGILを解放するので ThreadPool が効く）
-    def _ocr(entry: dict) -> dict:
-        texts = ocr_image(entry["image_path"])
-        if entry["ocr_path"] is not None and texts:
-            Path(entry["ocr_path"]).write_text("\n".join(texts), encoding="utf-8")
-        return {
-            "timestamp": entry["timestamp"],
-            "image_path": entry["image_path"],
-            "ocr_path": str(entry["ocr_path"]) if entry["ocr_path"] else None,
-            "ocr_texts": texts,
-        }
-
-    if not saved:
-        return []
-    workers = max(1, min(max_ocr_workers, len(saved)))
-    with ThreadPoolExecutor(max_workers=workers) as pool:
-        results = list(pool.map(_ocr, saved))
-    results.sort(key=lambda r: r["timestamp"])
+            entry = {"timestamp": ts, "image_path": str(img_path), "ocr_path": ocr_path}
+            in_flight.acquire()
+            future = pool.submit(ocr_frame, frame)
+            future.add_done_callback(lambda _: in_flight.release())
+            saved.append((entry, future))
+
+        results = []
+        for entry, future in saved:
+            texts = future.result()
+            if entry["ocr_path"] is not None and texts:
+                Path(entry["ocr_path"]).write_text("\n".join(texts), encoding="utf-8")
+            results.append(
+                {
+                    "timestamp": entry["timestamp"],
+                    "image_path": entry["image_path"],
+                    "ocr_path": str(entry["ocr_path"]) if entry["ocr_path"] else None,
+                    "ocr_texts": texts,
+                }
+            )
     return results
-
-
-def get_video_duration(video_path: str) -> float:
-    """Get video duration in seconds."""
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"Could not open video file: {video_path}")
-
-    try:
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        return total_frames / fps if fps > 0 else 0
-    finally:
-        cap.release()
@@ -1,17 +1,27 @@
 """MCP Server for meeting transcription."""
 
 import asyncio
+import errno
+import os
 import re
-import subprocess
+import shutil
+from collections import Counter
 from pathlib import Path
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
-from .frame_extractor import extract_frame, extract_frames, get_video_duration
+# 重い依存（cv2 / pyobjc の Vision・Quartz）を読む frame_extractor はフレーム系ハンドラ内で import する。
+# 文字起こしは transcribe CLI の子プロセスで動くので、サーバー側で torch/mlx を読むことは無い。
 
 LOG_FILE = Path("/tmp/meeting-transcriber.log")
+# ファイルを書き換える処理は同時に1本だけ。CLI 実行（LOG_FILE を切り詰めて書き、文字起こしを出力する）と
+# 書き込み系ハンドラ（話者名置換・案件ストア更新・ファイル確定）が並行すると、ログの取り違えや更新の消失が起きる
+_WRITE_LOCK = asyncio.Lock()
+
+# タイトルから除去するファイル名に使えない文字（str.translate 用の削除テーブル）
+_UNSAFE_TITLE_CHARS = str.maketrans("", "", '<>:"/\\|?*')
 
 server = Server("meeting-transcriber")
 
@@ -32,13 +42,13 @@ async def list_tools() -> list[Tool]:
                     },
                     "model": {
                         "type": "string",
-                        "description": "Whisperモデル (small-4bit/small/medium/large-v3/large-v3-turbo)",
+                        "description": "Whisperモデル (small-4bit/small/medium/large-v3/large-v3-turbo/large-v3-8bit/large-v3-4bit/large-v3-turbo-4bit)",
                         "default": "large-v3-turbo",
                     },
                     "diarizer": {
                         "type": "string",
                         "enum": ["speakrs", "pyannote"],
-                        "description": "話者識別バックエンド（既定: speakrs = Apple Silicon CoreMLで最速・pyannote同等精度）。pyannoteは同モデルだがCPUで低速",
+                        "description": "話者識別バックエンド（既定: speakrs = Apple Silicon CoreMLで最速・pyannote同等精度）。pyannoteは同モデル（CUDA/MPSがあればGPU・speakrsより低速）",
                         "default": "speakrs",
                     },
                     "context_path": {
@@ -79,7 +89,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="extract_video_frame",
-            description="動画から指定秒のフレームを抽出しbase64画像として返します。",
+            description="動画から指定秒のフレームを抽出してJPEG保存し、画像パスと画面内テキスト（OCR）を返します。画像は Read で視覚確認すること。",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -235,35 +245,69 @@ async def list_tools() -> list[Tool]:
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    # 読み取りだけの同期ハンドラ（動画デコード・OCR・読み込み）はスレッドへ逃がし、イベントループを塞がない。
+    # 並行に来たツール呼び出し（フレーム確認を複数投げる等）が互いを待たずに進む。
+    # ファイルを書き換えるハンドラは _WRITE_LOCK の下でイベントループ上で順に実行する（読み→書きの間に
+    # 他の更新や CLI の書き出しが割り込まない。いずれも軽いファイル操作なので塞ぐ時間は短い）
     try:
         if name == "transcribe_meeting":
             return await handle_transcribe_meeting(arguments)
         elif name == "extract_video_frame":
-            return handle_extract_video_frame(arguments)
+            return await asyncio.to_thread(handle_extract_video_frame, arguments)
         elif name == "extract_video_frames":
-            return handle_extract_video_frames(arguments)
+            return await asyncio.to_thread(handle_extract_video_frames, arguments)
         elif name == "update_speaker_names":
-            return handle_update_speaker_names(arguments)
+            async with _WRITE_LOCK:
+                return handle_update_speaker_names(arguments)
         elif name == "read_transcript":
-            return handle_read_transcript(arguments)
+            return await asyncio.to_thread(handle_read_transcript, arguments)
         elif name == "finalize_meeting_files":
-            return handle_finalize_meeting_files(arguments)
+            async with _WRITE_LOCK:
+                return handle_finalize_meeting_files(arguments)
         elif name == "enroll_voiceprints":
             return await handle_enroll_voiceprints(arguments)
         elif name == "identify_project":
-            return handle_identify_project(arguments)
+            return await asyncio.to_thread(handle_identify_project, arguments)
         elif name == "resolve_speakers":
             return await handle_resolve_speakers(arguments)
         elif name == "upsert_project_context":
-            return handle_upsert_project_context(arguments)
+            async with _WRITE_LOCK:
+                return handle_upsert_project_context(arguments)
         elif name == "list_projects":
-            return handle_list_projects(arguments)
+            return await asyncio.to_thread(handle_list_projects, arguments)
         else:
             return [TextContent(type="text", text=f"Unknown tool: {name}")]
     except Exception as e:
         return [TextContent(type="text", text=f"Error: {str(e)}")]
 
 
+async def _run_cli(cmd: list[str]) -> str:
+    """transcribe CLI を子プロセスで実行し、LOG_FILE に書かれたログ全文を返す。
+
+    asyncio の子プロセスとして待つので、数分かかる文字起こし中もイベントループを塞がず、
+    フレーム抽出など他のツール呼び出しを並行して受け付けられる。進行状況は transcribe --watch で見る。
+    ログファイルは1つなので、CLI 同士（文字起こし・声紋登録・話者解決）と書き込み系ハンドラは
+    _WRITE_LOCK で順番に実行する。呼び出しがキャンセルされた（クライアントのタイムアウト等）ときは
+    子プロセスを止め、終了を見届けてからロックを放す（再試行と2本並走させない）。
+    """
+    async with _WRITE_LOCK:
+        fd = os.open(LOG_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=fd, stderr=asyncio.subprocess.STDOUT)
+        finally:
+            os.close(fd)
+        try:
+            await process.wait()
+        except asyncio.CancelledError:
+            try:
+                process.terminate()
+            except ProcessLookupError:
+                pass
+            await asyncio.shield(process.wait())
+            raise
+        return LOG_FILE.read_bytes().decode("utf-8", errors="replace")
+
+
 async def handle_transcribe_meeting(arguments: dict) -> list[TextContent]:
     video_path = arguments["video_path"]
     output_path = arguments.get("output_path")
@@ -285,15 +329,11 @@ async def handle_transcribe_meeting(arguments: dict) -> list[TextContent]:
     if project:
         cmd.extend(["--project", project])
 
-    LOG_FILE.write_text("")
-    with open(LOG_FILE, "w") as log_file:
-        process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True, bufsize=1)
-        process.wait()
+    log_content = await _run_cli(cmd)
 
     if output_path is None:
         output_path = str(Path(video_path).parent / f"{Path(video_path).stem}_transcript.txt")
 
-    log_content = LOG_FILE.read_text()
     return [TextContent(type="text", text=f"完了\n出力: {output_path}\n\n{log_content}")]
 
 
@@ -306,12 +346,7 @@ async def handle_enroll_voiceprints(arguments: dict) -> list[TextContent]:
 
     cmd = ["transcribe", video_path, "--voiceprints", profile, "--enroll", _json.dumps(mapping, ensure_ascii=False)]
 
-    LOG_FILE.write_text("")
-    with open(LOG_FILE, "w") as log_file:
-        process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True, bufsize=1)
-        process.wait()
-
-    log_content = LOG_FILE.read_text()
+    log_content = await _run_cli(cmd)
     return [TextContent(type="text", text=f"声紋登録\nプロファイル: {profile}\n\n{log_content}")]
 
 
@@ -319,8 +354,13 @@ def handle_extract_video_frame(arguments: dict) -> list[TextContent]:
     video_path = arguments["video_path"]
     timestamp_seconds = arguments["timestamp_seconds"]
     output_dir = arguments.get("output_dir")
-    duration = get_video_duration(video_path)
-    output_path, ocr_texts, ocr_path = extract_frame(video_path, timestamp_seconds, output_dir)
+
+    from .frame_extractor import get_extractor
+
+    # 動画長は抽出に使う capture が開いた時点で読めているので、別に開き直さない
+    extractor = get_extractor(video_path)
+    output_path, ocr_texts, ocr_path = extractor.frame_at(timestamp_seconds, output_dir)
+    duration = extractor.duration
 
     ocr_section = ""
     if ocr_texts:
@@ -342,6 +382,9 @@ def handle_extract_video_frames(arguments: dict) -> list[TextContent]:
     video_path = arguments["video_path"]
     timestamps = arguments["timestamps_seconds"]
     output_dir = arguments.get("output_dir")
+
+    from .frame_extractor import extract_frames
+
     results = extract_frames(video_path, timestamps, output_dir)
 
     if not results:
@@ -365,16 +408,31 @@ def handle_update_speaker_names(arguments: dict) -> list[TextContent]:
     if not path.exists():
         return [TextContent(type="text", text=f"ファイルが見つかりません: {transcript_path}")]
 
-    content = path.read_text(encoding="utf-8")
+    content = path.read_bytes().decode("utf-8")
     replacements = []
-    for old_name, new_name in speaker_mapping.items():
-        pattern = re.compile(re.escape(old_name) + r"(?=\s*\()")
-        matches = pattern.findall(content)
-        if matches:
-            content = pattern.sub(new_name, content)
-            replacements.append(f"{old_name} -> {new_name} ({len(matches)}箇所)")
-
-    path.write_text(content, encoding="utf-8")
+    if speaker_mapping:
+        # 全ラベルを1つの選択パターンにまとめ、本文を1回だけ走査する（長いラベル優先で 発話者1/発話者10 を区別）。
+        # 1パスなので 発話者1↔発話者2 の入れ替えも連鎖置換にならない
+        keys = sorted(speaker_mapping, key=len, reverse=True)
+        pattern = re.compile("(" + "|".join(re.escape(k) for k in keys) + r")(?=\s*\()")
+        counts = Counter()
+
+        def replace(match: re.Match) -> str:
+            counts[match.group(1)] += 1
+            return speaker_mapping[match.group(1)]
+
+        # subn は置換後の文字列と総件数を1回の走査で返す（件数のための findall 走査は不要）
+        content, total = pattern.subn(replace, content)
+        if total:
+            replacements = [
+                f"{old_name} -> {new_name} ({counts[old_name]}箇所)"
+                for old_name, new_name in speaker_mapping.items()
+                if counts[old_name]
+            ]
+
+    # 置換が無ければ書き戻さない（全文の再エンコード＋書き込みを省く）
+    if replacements:
+        path.write_bytes(content.encode("utf-8"))
     return [TextContent(type="text", text="置換完了\n" + "\n".join(replacements) if replacements else "置換対象なし")]
 
 
@@ -382,7 +440,7 @@ def handle_read_transcript(arguments: dict) -> list[TextContent]:
     path = Path(arguments["transcript_path"])
     if not path.exists():
         return [TextContent(type="text", text=f"ファイルが見つかりません: {path}")]
-    return [TextContent(type="text", text=path.read_text(encoding="utf-8"))]
+    return [TextContent(type="text", text=path.read_bytes().decode("utf-8"))]
 
 
 def handle_finalize_meeting_files(arguments: dict) -> list[TextContent]:
@@ -397,7 +455,7 @@ def handle_finalize_meeting_files(arguments: dict) -> list[TextContent]:
     video_dir = video_path.parent
 
     # タイトルからファイル名に使えない文字を除去
-    safe_title = re.sub(r'[<>:"/\\|?*]', "", title).strip()
+    safe_title = title.translate(_UNSAFE_TITLE_CHARS).strip()
     if not safe_title:
         return [TextContent(type="text", text="タイトルが無効です")]
 
@@ -415,9 +473,14 @@ def handle_finalize_meeting_files(arguments: dict) -> list[TextContent]:
     new_minutes_path = output_dir / f"{video_stem}_minutes_{safe_title}.md"
 
     if transcript_path.exists():
-        content = transcript_path.read_text(encoding="utf-8")
-        new_transcript_path.write_text(content, encoding="utf-8")
-        transcript_path.unlink()  # 元ファイルを削除
+        # 同一ファイルシステムなら rename（データを動かさない）。別ボリュームならコピーして元を削除
+        try:
+            transcript_path.rename(new_transcript_path)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.copy2(transcript_path, new_transcript_path)
+            transcript_path.unlink()
         moved_msg = f"文字起こしファイルを移動しました: {new_transcript_path}"
     else:
         moved_msg = f"文字起こしファイルが見つかりません: {transcript_path}"
@@ -471,13 +534,9 @@ async def handle_resolve_speakers(arguments: dict) -> list[TextContent]:
     elif voiceprint_profile:
         cmd.extend(["--voiceprints", voiceprint_profile])
 
-    LOG_FILE.write_text("")
-    with open(LOG_FILE, "w") as log_file:
-        process = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, text=True, bufsize=1)
-        process.wait()
+    log_content = await _run_cli(cmd)
 
     sidecar = str(Path(video_path).with_name(Path(video_path).stem + "_speakers.json"))
-    log_content = LOG_FILE.read_text()
     return [TextContent(type="text", text=f"話者ヒント算出\nサイドカー: {sidecar}\n\n{log_content}")]
 
 
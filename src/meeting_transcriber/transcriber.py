@@ -1,18 +1,30 @@
-"""Whisper-based transcription module using mlx-whisper for Apple Silicon."""
+"""Whisper-based transcription module using mlx-whisper for Apple Silicon.
 
+mlx_whisper は transcribe_audio の中で遅延 import する（DEFAULT_MODEL / format_timestamp /
+ensure_audio だけを使う CLI の --help・--watch・--kill や声紋系モードで MLX を読み込まないため）。
+"""
+
+import hashlib
+import os
 import subprocess
 import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-import mlx_whisper
-
 MLX_MODELS = {
     "small-4bit": "mlx-community/whisper-small-mlx-4bit",
     "small": "mlx-community/whisper-small-mlx",
     "medium": "mlx-community/whisper-medium-mlx",
     "large-v3": "mlx-community/whisper-large-v3-mlx",
     # fp16フル精度・約1.6GB。日本語はlarge-v2同等精度をmedium並みの速度で出す（推奨デフォルト）
+    # デコーダが4層しかなく単語時刻（アライメントヘッドの DTW）は large-v3 より粗い
     "large-v3-turbo": "mlx-community/whisper-large-v3-turbo",
+    # 量子化版（重みの転送量が減りデコードが速い）。日本語は精度が落ちるので明示指定時のみ。
+    # 8bit は劣化が小さく、4bit は速度優先
+    "large-v3-8bit": "mlx-community/whisper-large-v3-mlx-8bit",
+    "large-v3-4bit": "mlx-community/whisper-large-v3-mlx-4bit",
+    "large-v3-turbo-4bit": "mlx-community/whisper-large-v3-turbo-q4",
 }
 
 DEFAULT_MODEL = "large-v3-turbo"
@@ -55,37 +67,166 @@ def _build_prompt(glossary: list[str] | None, limit: int = 224) -> str:
     return _BASE_PROMPT
 
 
+_soxr_available = None
+
+
+def _has_soxr() -> bool:
+    """ffmpeg が libsoxr 付きでビルドされているか（プロセス内で1回だけ調べる）。"""
+    global _soxr_available
+    if _soxr_available is None:
+        try:
+            proc = subprocess.run(["ffmpeg", "-hide_banner", "-buildconf"], capture_output=True, text=True, timeout=5)
+            _soxr_available = "--enable-libsoxr" in proc.stdout
+        except (OSError, subprocess.TimeoutExpired):
+            _soxr_available = False
+    return _soxr_available
+
+
 def extract_audio(video_path: str, output_path: str) -> None:
-    cmd = ["ffmpeg", "-i", video_path, "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", "-y", output_path]
+    """動画の先頭音声ストリームだけを 16kHz mono PCM wav に抽出する。
+
+    -map 0:a:0 で音声1本だけを選び、映像・字幕・データストリームはデコーダを起動しない
+    （映像は復号されないので hwaccel は不要）。-nostdin は MCP 経由の実行で標準入力を奪わないため。
+    16kHz への変換は、ffmpeg が libsoxr 付きなら soxr（SIMD 化された多相フィルタ）で行い、
+    無ければ既定の swresample のまま。
+    """
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-i",
+        video_path,
+        "-map",
+        "0:a:0",
+        "-vn",
+        "-sn",
+        "-dn",
+        *(["-af", "aresample=16000:resampler=soxr"] if _has_soxr() else []),
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        "16000",
+        "-ac",
+        "1",
+        "-y",
+        output_path,
+    ]
     subprocess.run(cmd, check=True, capture_output=True)
 
 
+def _is_whisper_wav(wav: wave.Wave_read) -> bool:
+    """extract_audio の出力と同じ形式（16kHz mono 16bit PCM）か。"""
+    return wav.getframerate() == 16000 and wav.getnchannels() == 1 and wav.getsampwidth() == 2
+
+
+def is_16k_mono_wav(audio_path: str) -> bool:
+    """既に 16kHz mono / 16-bit PCM WAV か（ensure_audio の出力はこれ）。ヘッダだけ読む。
+
+    ensure_audio の素通し判定と speakrs 版 diarize_audio の変換要否判定で共用する。
+    壊れた・別形式なら False。ストリーム書き出し中・書きかけの wav は data サイズが 0 や
+    0xFFFFFFFF（未確定）のままなので、ヘッダのサイズが実ファイルに収まらなければ False
+    （ffmpeg 経由で作り直させる）。
+    """
+    try:
+        with open(audio_path, "rb") as f, wave.open(f) as wav:
+            if not _is_whisper_wav(wav):
+                return False
+            data_bytes = wav.getnframes() * wav.getsampwidth()
+            return 0 < data_bytes <= os.fstat(f.fileno()).st_size - f.tell()
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
 def ensure_audio(video_path: str, audio_path: str | None = None) -> str:
     """16kHz mono wav を用意して返す。既存wavが動画より新しければ再抽出しない（高速化）。
 
     transcribe→enroll→resolve_speakers と同じ動画を複数回処理する際、ffmpeg抽出の重複を
-    避けるためのキャッシュ。パスは動画stem基準で決定的なので各処理から共有される。
+    避けるためのキャッシュ。パスは動画の絶対パス基準で決定的なので各処理（別プロセス）から共有される
+    （だから終了時に消さない）。stem だけだと別フォルダの同名動画（recording.mp4 等）が同じ wav を
+    取り違えるので、絶対パスのハッシュを名前に含める。抽出は一意な一時名に書いてから置き換えるので、
+    中断で途中までの wav がキャッシュとして残ることはない。
+
+    入力自体が既に 16kHz mono 16bit の wav（他ツールの出力など）なら ffmpeg を起動せずそのパスを返す。
     """
     video = Path(video_path)
+    if audio_path is None and video.suffix.lower() == ".wav" and is_16k_mono_wav(video):
+        return str(video)
     if audio_path is None:
         audio_dir = Path(tempfile.gettempdir()) / "meeting_transcriber"
         audio_dir.mkdir(exist_ok=True)
-        audio_path = audio_dir / f"{video.stem}.wav"
+        key = hashlib.blake2b(str(video.resolve()).encode(), digest_size=8).hexdigest()
+        audio_path = audio_dir / f"{video.stem}.{key}.wav"
     audio = Path(audio_path)
     try:
         if audio.exists() and audio.stat().st_size > 0 and audio.stat().st_mtime >= video.stat().st_mtime:
             return str(audio)
     except OSError:
         pass
-    extract_audio(str(video), str(audio))
+    # 一時名はプロセスごとに一意にする（同じ動画を並行して抽出しても互いの書きかけを置き換えない）
+    fd, tmp_name = tempfile.mkstemp(prefix=f"{audio.stem}.", suffix=".part.wav", dir=audio.parent)
+    os.close(fd)
+    partial = Path(tmp_name)
+    try:
+        extract_audio(str(video), str(partial))
+        partial.replace(audio)
+    finally:
+        partial.unlink(missing_ok=True)
     return str(audio)
 
 
+def load_audio_array(audio_path: str):
+    """extract_audio が書いた 16kHz mono s16 wav を float32 の numpy 配列として読む。
+
+    mlx_whisper.transcribe にパスを渡すと内部で ffmpeg を再度起動して wav をデコードし直す。
+    形式が分かっている wav なので、ここで直接読んで配列で渡す（子プロセス1回とデコード1回を省く）。
+    wav でない（mp3・m4a 等）・ヘッダが壊れている・想定外の形式なら None（呼び出し側はパスのまま渡し、
+    mlx_whisper 側の ffmpeg でデコードさせる）。
+
+    PCM 本体は memmap で読み、float32 への変換とスケーリングを出力配列1本に直接書く
+    （bytes への読み込み・astype・除算の中間配列を作らない。1時間で 115MB の int16 を1回なめるだけ）。
+    """
+    import numpy as np
+
+    try:
+        with open(audio_path, "rb") as f, wave.open(f) as wav:
+            if not _is_whisper_wav(wav):
+                return None
+            # wave はヘッダを読み終えると data チャンク本体の先頭で止まる
+            offset = f.tell()
+            # data サイズが未確定（0xFFFFFFFF）の wav もあるので、実ファイルに収まる分だけ読む
+            frames = min(wav.getnframes(), (os.fstat(f.fileno()).st_size - offset) // 2)
+    except (wave.Error, EOFError):
+        return None
+    audio = np.empty(frames, dtype=np.float32)
+    if frames:
+        pcm = np.memmap(audio_path, dtype="<i2", mode="r", offset=offset, shape=(frames,))
+        np.multiply(pcm, np.float32(1.0 / 32768.0), out=audio)
+        del pcm
+    return audio
+
+
+def preload_model(model_name: str = DEFAULT_MODEL) -> None:
+    """モデルを読み込んで重みを実体化しておく（初回デコード時のロード待ちを前倒しする）。
+
+    mlx_whisper.transcribe は内部の ModelHolder に直近のモデルを保持し、同じ repo・dtype なら
+    再ロードしない。ここで同じ ModelHolder に載せ、MLX の遅延評価で後回しになる重みの読み込みを
+    mx.eval で済ませておく。失敗しても transcribe 側が通常どおりロードするので握りつぶす。
+    """
+    try:
+        import mlx.core as mx
+        from mlx_whisper.transcribe import ModelHolder
+
+        model = ModelHolder.get_model(MLX_MODELS.get(model_name, MLX_MODELS[DEFAULT_MODEL]), mx.float16)
+        mx.eval(model.parameters())
+    except Exception:  # noqa: BLE001
+        pass
+
+
 def transcribe_audio(
     audio_path: str,
     model_name: str = DEFAULT_MODEL,
     max_accuracy: bool = True,
     glossary: list[str] | None = None,
+    word_timestamps: bool = True,
 ) -> dict:
     """音声を文字起こしする。
 
@@ -96,23 +237,34 @@ def transcribe_audio(
     重要な制約: condition_on_previous_text=False のため initial_prompt は
     冒頭セグメントにしか効かず会議後半へ伝播しない。固有名詞の確実な正規化は
     ASR後の決定的置換 + Claude校正（議事録生成スキル側）で担保する設計。
+
+    word_timestamps=False は単語単位の時刻合わせ（アテンション上の DTW）を省いてデコードを軽くする。
+    ただし単語時刻は話者割当の多数決と hallucination_silence_threshold（無音区間の幻聴除去）が
+    前提にしているので、どちらも使わないとき（--fast かつ話者識別なし）だけ外すこと。
     """
+    import mlx_whisper
+
     model_repo = MLX_MODELS.get(model_name, MLX_MODELS[DEFAULT_MODEL])
+    audio = load_audio_array(audio_path)
+    if audio is None:
+        audio = audio_path
 
     if not max_accuracy:
         return mlx_whisper.transcribe(
-            audio_path,
+            audio,
             path_or_hf_repo=model_repo,
             language="ja",
-            word_timestamps=True,
+            word_timestamps=word_timestamps,
             verbose=False,
+            # 前窓のテキストをプロンプトに積まない（窓ごとのプレフィル削減＋繰り返しの伝播防止）
+            condition_on_previous_text=False,
         )
 
     return mlx_whisper.transcribe(
-        audio_path,
+        audio,
         path_or_hf_repo=model_repo,
         language="ja",
-        word_timestamps=True,
+        word_timestamps=word_timestamps,
         verbose=False,
         initial_prompt=_build_prompt(glossary),
         # 閾値違反時のみ昇温して再デコード（標準のフォールバック挙動）
@@ -125,10 +277,13 @@ def transcribe_audio(
     )
 
 
+# 00〜59 のゼロ埋め文字列（format_timestamp で毎回整形しないための表）
+_PAD2 = tuple(f"{i:02d}" for i in range(60))
+
+
 def format_timestamp(seconds: float) -> str:
-    minutes = int(seconds // 60)
-    secs = int(seconds % 60)
-    return f"{minutes:02d}:{secs:02d}"
+    minutes, secs = divmod(int(seconds), 60)
+    return f"{_PAD2[minutes] if minutes < 60 else minutes}:{_PAD2[secs]}"
 
 
 def transcribe_video(
@@ -136,12 +291,50 @@ def transcribe_video(
     model_name: str = DEFAULT_MODEL,
     max_accuracy: bool = True,
     glossary: list[str] | None = None,
+    word_timestamps: bool = True,
 ) -> tuple[dict, str]:
     video_path = Path(video_path)
     if not video_path.exists():
         raise FileNotFoundError(f"Video file not found: {video_path}")
 
-    audio_path = ensure_audio(str(video_path))
-    result = transcribe_audio(audio_path, model_name, max_accuracy, glossary)
+    # ffmpeg の音声抽出（子プロセス）を別スレッドで進めつつ、メインスレッドでモデルをロードする。
+    # MLX の評価はメインスレッドに置く（ストリームがスレッドごとのため）
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        audio_future = pool.submit(ensure_audio, str(video_path))
+        preload_model(model_name)
+        audio_path = audio_future.result()
+    result = transcribe_audio(audio_path, model_name, max_accuracy, glossary, word_timestamps)
 
     return result, str(audio_path)
+
+
+def transcribe_videos(
+    video_paths: list[str],
+    model_name: str = DEFAULT_MODEL,
+    max_accuracy: bool = True,
+    glossary: list[str] | None = None,
+    word_timestamps: bool = True,
+) -> list[tuple[dict, str]]:
+    """複数動画をまとめて文字起こしする（戻り値は video_paths と同順の (result, audio_path)）。
+
+    音声抽出（ffmpeg 子プロセス・ファイルごとに独立）は全件を並列に走らせ、その間にモデルを
+    1回だけロードする。文字起こしは抽出済みのものから順に始めるので、後続ファイルの抽出（CPU）と
+    前のファイルのデコード（GPU）が重なる。MLX の評価はスレッドごとのストリームに載り、
+    ModelHolder もモデルを1つしか持たないので、文字起こし自体は呼び出しスレッドで1本ずつ回す
+    （GPU は1本のデコードでほぼ埋まる）。
+    """
+    paths = [Path(p) for p in video_paths]
+    for path in paths:
+        if not path.exists():
+            raise FileNotFoundError(f"Video file not found: {path}")
+    if not paths:
+        return []
+
+    results = []
+    with ThreadPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+        audio_futures = [pool.submit(ensure_audio, str(path)) for path in paths]
+        preload_model(model_name)
+        for future in audio_futures:
+            audio = future.result()
+            results.append((transcribe_audio(audio, model_name, max_accuracy, glossary, word_timestamps), audio))
+    return results
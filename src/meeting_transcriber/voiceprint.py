@@ -77,7 +77,7 @@ def save_db(db: dict, profile: str) -> Path:
 def _embedding_device():
     """声紋embeddingの計算デバイス。既定 auto（Apple Silicon の MPS があれば使う）。
 
-    diarization は MPS でタイムスタンプが崩れる報告があり cpu 既定だが、embedding は
+    diarization は MPS でタイムスタンプが崩れる報告がある（segmentation 側）が、embedding は
     window='whole' で区間→単一ベクトルを出すだけ（タイムスタンプ非依存）なので、その問題が
     当てはまらず MPS を安全に使える。声紋登録/識別が遅い主因が CPU 固定だったため auto に。
     MEETING_VOICEPRINT_DEVICE=cpu/mps/auto で上書き可。
@@ -136,6 +136,20 @@ def _cosine(a: np.ndarray, b: np.ndarray) -> float:
     return float(np.dot(a, b) / (na * nb))
 
 
+def _cosine_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """行ベクトル同士のコサイン類似度行列（a:(N,D), b:(M,D) → (N,M)。ゼロベクトルは0）。
+
+    ペアごとに _cosine を呼ぶ Python の二重ループを、正規化した行列の積1回に置き換える。
+    """
+    a = np.atleast_2d(np.asarray(a, dtype=float))
+    b = np.atleast_2d(np.asarray(b, dtype=float))
+    na = np.linalg.norm(a, axis=1, keepdims=True)
+    nb = np.linalg.norm(b, axis=1, keepdims=True)
+    a = np.divide(a, na, out=np.zeros_like(a), where=na > 0)
+    b = np.divide(b, nb, out=np.zeros_like(b), where=nb > 0)
+    return a @ b.T
+
+
 def _cluster_segments(diar_segments: list[dict]) -> dict[str, list[tuple[float, float]]]:
     """diarization の生ラベル(SPEAKER_xx)ごとに [(start,end)] を集約する。"""
     clusters: dict[str, list[tuple[float, float]]] = {}
@@ -150,12 +164,16 @@ def _embed_segments(audio_path: str, segments: list[tuple[float, float]]) -> np.
     """区間群の声紋を長さ重み平均で1ベクトルにまとめる。"""
     from pyannote.core import Segment
 
+    from .diarization_v2 import load_waveform
+
     inference = _get_inference()
+    # パスを渡すと crop のたびにファイルを開き直すので、デコード済み波形を使い回す
+    audio = load_waveform(audio_path)
     vecs, weights = [], []
     # 長い区間を優先（話者の手掛かりが強い）。最大8区間まで使えば十分。
     for start, end in sorted(segments, key=lambda s: s[1] - s[0], reverse=True)[:8]:
         try:
-            raw = inference.crop(audio_path, Segment(start, end))
+            raw = inference.crop(audio, Segment(start, end))
             if hasattr(raw, "detach"):  # torch.Tensor(MPS/CUDA含む) は CPU numpy へ
                 raw = raw.detach().to("cpu").numpy()
             emb = np.asarray(raw).reshape(-1)
@@ -242,6 +260,7 @@ def identify(
 
     names = list(speakers.keys())
     refs = {n: np.asarray(speakers[n]["embedding"]) for n in names}
+    ref_matrix = np.vstack([refs[n] for n in names])
 
     result: dict[str, str | None] = {}
     updated = False
@@ -251,7 +270,7 @@ def identify(
         if emb is None:
             result[label] = None
             continue
-        scored = sorted(((_cosine(emb, refs[n]), n) for n in names), reverse=True)
+        scored = sorted(zip(_cosine_matrix(emb, ref_matrix)[0].tolist(), names, strict=True), reverse=True)
         best_score, best_name = scored[0]
         second = scored[1][0] if len(scored) > 1 else 0.0
         if best_score >= threshold and (best_score - second) >= margin:
@@ -262,6 +281,7 @@ def identify(
                 merged = (old * cnt + emb) / (cnt + 1)
                 speakers[best_name] = {"embedding": merged.tolist(), "enroll_count": cnt + 1}
                 refs[best_name] = merged
+                ref_matrix[names.index(best_name)] = merged
                 updated = True
         else:
             result[label] = None
@@ -330,10 +350,12 @@ def cluster_similarity(audio_path: str, diar_segments: list[dict], detect_mixed:
 
     pairs: list[dict] = []
     suggestions: list[dict] = []
+    means = np.vstack([units[label]["mean"] for label in labels]) if labels else np.empty((0, 0))
+    sims = _cosine_matrix(means, means) if labels else means
     for i in range(len(labels)):
         for j in range(i + 1, len(labels)):
             a, b = labels[i], labels[j]
-            score = round(float(_cosine(units[a]["mean"], units[b]["mean"])), 3)
+            score = round(float(sims[i, j]), 3)
             pairs.append({"a": a, "b": b, "score": score})
             if score >= MERGE_THRESHOLD:
                 suggestions.append(
@@ -354,8 +376,8 @@ def cluster_similarity(audio_path: str, diar_segments: list[dict], detect_mixed:
                 continue
             # クラスタ内区間の『ペア間最小コサイン』。同一話者なら高い(>0.6)が、別人が混ざると
             # その別人区間との類似度が落ちて低くなる。平均への距離より混在に敏感。
-            pair_cos = [_cosine(us[i], us[j]) for i in range(len(us)) for j in range(i + 1, len(us))]
-            low = min(pair_cos)
+            pair_cos = _cosine_matrix(np.vstack(us), np.vstack(us))
+            low = pair_cos[np.triu_indices(len(us), k=1)].min()
             if low < MIXED_COHESION:
                 mixed.append({"label": label, "min_cohesion": round(float(low), 3), "segments": len(us)})
 
@@ -384,7 +406,7 @@ def identify_segments(
     if not speakers:
         return []
     names = list(speakers.keys())
-    refs = {n: np.asarray(speakers[n]["embedding"]) for n in names}
+    ref_matrix = np.vstack([np.asarray(speakers[n]["embedding"]) for n in names])
 
     label2cluster = _label_to_cluster(diar_segments)
     cluster2label = {c: lbl for lbl, c in label2cluster.items()}
@@ -401,7 +423,7 @@ def identify_segments(
         emb = _embed_segments(audio_path, [(d["start"], d["end"])])
         if emb is None:
             continue
-        scored = sorted(((_cosine(emb, refs[n]), n) for n in names), reverse=True)
+        scored = sorted(zip(_cosine_matrix(emb, ref_matrix)[0].tolist(), names, strict=True), reverse=True)
         best_score, best_name = scored[0]
         second = scored[1][0] if len(scored) > 1 else 0.0
         if best_score >= threshold and (best_score - second) >= margin:
@@ -0,0 +1,70 @@
+"""CLI の純ロジック（起動の軽さ・話者ブロック整形・プロセス判定）のテスト。"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from meeting_transcriber import cli
+
+
+def test_import_does_not_load_heavy_modules():
+    # --help / --watch / --kill を即起動させるため、cli の import で torch/mlx/pyannote/cv2 を読まない
+    code = (
+        "import sys; import meeting_transcriber.cli; "
+        "print(','.join(m for m in ('mlx_whisper', 'torch', 'torchaudio', 'pyannote.audio', 'cv2') if m in sys.modules))"
+    )
+    env = {**os.environ, "PYTHONPATH": str(Path(cli.__file__).resolve().parents[1])}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.strip() == ""
+
+
+def test_iter_transcript_blocks_groups_by_speaker():
+    segments = (
+        [0.0, 2.0, 65.0],
+        [2.0, 3.0, 66.0],
+        ["発話者1", "発話者1", "発話者2"],
+        ["おはよう", "ございます。", "はい。"],
+    )
+    text = "".join(cli.iter_transcript_blocks(segments))
+    assert text == "発話者1 (00:00)\nおはようございます。\n\n発話者2 (01:05)\nはい。\n"
+    assert "".join(cli.iter_transcript_blocks(([], [], [], []))) == ""
+
+
+def test_write_transcript_applies_normalization(tmp_path):
+    out = tmp_path / "t.txt"
+    segments = ([0.0], [1.0], ["発話者1"], ["えーしゃです"])
+    ctx = {"normalization": {"deterministic": [{"correct": "A社", "wrong": ["えーしゃ"]}]}}
+    report = cli.write_transcript(segments, out, ctx)
+    assert out.read_text(encoding="utf-8") == "発話者1 (00:00)\nA社です\n"
+    assert report
+
+
+def test_write_transcript_streams_large_output(tmp_path):
+    out = tmp_path / "t.txt"
+    n = 40000  # 1MB のフラッシュ境界をまたぐ量
+    segments = ([float(i) for i in range(n)], [0.0] * n, [f"発話者{i % 2 + 1}" for i in range(n)], ["あ" * 10] * n)
+    assert cli.write_transcript(segments, out) == []
+    assert out.read_text(encoding="utf-8") == "".join(cli.iter_transcript_blocks(segments))
+
+
+def test_should_skip_process():
+    assert cli.should_skip_process(10, 10, "transcribe video.mov")  # 自分自身
+    assert cli.should_skip_process(1, 2, "transcribe --watch")
+    assert cli.should_skip_process(1, 2, "transcribe -k")
+    assert cli.should_skip_process(1, 2, "tail -f /tmp/meeting-transcriber.log")
+    assert not cli.should_skip_process(1, 2, "python -m meeting_transcriber.server")
+
+
+def test_resolve_diarizer_backend():
+    assert cli.resolve_diarizer_backend(SimpleNamespace(diarizer=None, diarization_v2=False)) == "speakrs"
+    assert cli.resolve_diarizer_backend(SimpleNamespace(diarizer=None, diarization_v2=True)) == "pyannote"
+    assert cli.resolve_diarizer_backend(SimpleNamespace(diarizer="speakrs", diarization_v2=True)) == "speakrs"
+
+
+def test_resolve_project_without_project():
+    args = SimpleNamespace(context="ctx.yaml", voiceprints="team", project=None, speakers=None)
+    assert cli.resolve_project(args) == ("ctx.yaml", "team")
+    assert cli.speaker_count_hint(SimpleNamespace(speakers=3), None) == 3
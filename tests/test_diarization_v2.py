@@ -0,0 +1,222 @@
+"""diarization_v2 の純ロジック（チャンク分割・チャンク間の話者照合）のテスト。
+
+torch/torchaudio/pyannote は sys.modules にスタブを差し込んで import だけ通す（推論はしない）。
+"""
+
+import importlib
+import sys
+import types
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+_MODULE = "meeting_transcriber.diarization_v2"
+
+
+@pytest.fixture(scope="module")
+def dv2():
+    torch = types.ModuleType("torch")
+    torch.device = lambda device_type: SimpleNamespace(type=device_type)
+    pyannote_audio = types.ModuleType("pyannote.audio")
+    pyannote_audio.Pipeline = object
+    stubs = {
+        "torch": torch,
+        "torchaudio": types.ModuleType("torchaudio"),
+        "pyannote": types.ModuleType("pyannote"),
+        "pyannote.audio": pyannote_audio,
+    }
+    saved = {name: sys.modules.get(name) for name in (*stubs, _MODULE)}
+    sys.modules.update(stubs)
+    sys.modules.pop(_MODULE, None)
+    try:
+        yield importlib.import_module(_MODULE)
+    finally:
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+
+
+def test_chunk_bounds_cover_duration_without_gaps(dv2):
+    bounds = dv2._chunk_bounds(250.0, 100.0, 10.0)
+    assert bounds == [
+        (0.0, 100.0, 0.0, 95.0),
+        (90.0, 190.0, 95.0, 185.0),
+        (180.0, 250.0, 185.0, 250.0),
+    ]
+    # 担当区間は隙間なく連続し、切り出し区間の内側に収まる
+    for (_, _, _, own_end), (_, _, own_start, _) in zip(bounds, bounds[1:], strict=False):
+        assert own_end == own_start
+    for start, end, own_start, own_end in bounds:
+        assert start <= own_start < own_end <= end
+
+
+def test_chunk_bounds_single_chunk(dv2):
+    assert dv2._chunk_bounds(50.0, 100.0, 10.0) == [(0.0, 50.0, 0.0, 50.0)]
+
+
+def test_match_chunk_speakers_links_by_centroid(dv2):
+    centroids, counts = [], []
+    first = dv2._match_chunk_speakers({"A": np.array([1.0, 0.0]), "B": np.array([0.0, 1.0])}, centroids, counts)
+    assert first == {"A": "SPEAKER_00", "B": "SPEAKER_01"}
+
+    # 次のチャンクのラベルは別名でも、重心が近い全体話者へ繋がる。遠い話者は新規
+    second = dv2._match_chunk_speakers(
+        {"x": np.array([0.1, 2.0]), "y": np.array([3.0, 0.2]), "z": np.array([-1.0, -1.0])}, centroids, counts
+    )
+    assert second == {"x": "SPEAKER_01", "y": "SPEAKER_00", "z": "SPEAKER_02"}
+    assert counts == [2, 2, 1]
+
+
+def test_match_chunk_speakers_is_one_to_one(dv2):
+    centroids, counts = [], []
+    dv2._match_chunk_speakers({"A": np.array([1.0, 0.0])}, centroids, counts)
+    # 両方とも SPEAKER_00 に近いが、割当ては類似度の高い方だけ。もう一方は新規話者
+    mapping = dv2._match_chunk_speakers({"p": np.array([1.0, 0.1]), "q": np.array([1.0, 0.3])}, centroids, counts)
+    assert mapping == {"p": "SPEAKER_00", "q": "SPEAKER_01"}
+
+
+class _Module:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.moved_to = None
+
+    def to(self, device):
+        if self.fail:
+            raise RuntimeError("boom")
+        self.moved_to = device.type
+
+
+def test_pin_segmentation_to_cpu(dv2):
+    mps = SimpleNamespace(type="mps")
+
+    pipeline = _Module()
+    pipeline._segmentation = _Module()
+    assert dv2._pin_segmentation_to_cpu(pipeline, mps).type == "mps"
+    assert pipeline._segmentation.moved_to == "cpu"
+    assert pipeline.moved_to is None
+
+    # segmentation を CPU に戻せなければ、MPS のまま続けずにパイプライン全体を CPU へ
+    for segmentation in (_Module(fail=True), None):
+        pipeline = _Module()
+        pipeline._segmentation = segmentation
+        assert dv2._pin_segmentation_to_cpu(pipeline, mps).type == "cpu"
+        assert pipeline.moved_to == "cpu"
+
+    cpu = SimpleNamespace(type="cpu")
+    assert dv2._pin_segmentation_to_cpu(_Module(), cpu) is cpu
+
+
+def test_chunk_seconds_ignores_invalid_values(dv2, monkeypatch, capsys):
+    monkeypatch.delenv("MEETING_DIARIZER_CHUNK_SEC", raising=False)
+    assert dv2._chunk_seconds() == 0.0
+    monkeypatch.setenv("MEETING_DIARIZER_CHUNK_SEC", "0")
+    assert dv2._chunk_seconds() == 0.0
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setenv("MEETING_DIARIZER_CHUNK_SEC", "600")
+    assert dv2._chunk_seconds() == 600.0
+    for raw in ("10min", "-5", "5", "nan", "inf"):
+        monkeypatch.setenv("MEETING_DIARIZER_CHUNK_SEC", raw)
+        assert dv2._chunk_seconds() == 0.0
+        assert "無効" in capsys.readouterr().out
+
+
+def test_chunk_workers_default_by_device(dv2, monkeypatch):
+    monkeypatch.delenv("MEETING_DIARIZER_CHUNK_WORKERS", raising=False)
+
+    def on(device_type):
+        return SimpleNamespace(device=SimpleNamespace(type=device_type))
+
+    assert dv2._chunk_workers(on("cpu")) == 2
+    assert dv2._chunk_workers(on("cuda")) == 2
+    assert dv2._chunk_workers(on("mps")) == 1
+    assert dv2._chunk_workers(SimpleNamespace()) == 1
+    monkeypatch.setenv("MEETING_DIARIZER_CHUNK_WORKERS", "3")
+    assert dv2._chunk_workers(on("mps")) == 3
+    monkeypatch.setenv("MEETING_DIARIZER_CHUNK_WORKERS", "two")
+    assert dv2._chunk_workers(on("cpu")) == 2
+
+
+def _speaker_at_brute(t, diarization_segments):
+    """時刻 t を含む最初の区間、無ければ最も近い区間（同距離なら先の区間）の話者。"""
+    for d in diarization_segments:
+        if d["start"] <= t <= d["end"]:
+            return d["speaker"]
+    best, best_dist = None, None
+    for d in diarization_segments:
+        dist = min(abs(t - d["start"]), abs(t - d["end"]))
+        if best_dist is None or dist < best_dist:
+            best, best_dist = d["speaker"], dist
+    return best
+
+
+def _assign_brute(whisper_result, diarization_segments):
+    """二分探索化する前の総当たり版（単語中点の重み付き投票 → 最大オーバーラップ → 中点）。"""
+    speaker_map = {spk: f"発話者{i + 1}" for i, spk in enumerate(sorted({d["speaker"] for d in diarization_segments}))}
+    labels = []
+    for segment in whisper_result["segments"]:
+        votes = {}
+        for w in segment.get("words") or []:
+            if w.get("start") is None or w.get("end") is None:
+                continue
+            spk = _speaker_at_brute((w["start"] + w["end"]) / 2, diarization_segments)
+            if spk is not None:
+                votes[spk] = votes.get(spk, 0.0) + max(0.01, w["end"] - w["start"])
+        if votes:
+            best = max(votes, key=votes.get)
+        else:
+            best, best_overlap = None, 0.0
+            for d in diarization_segments:
+                overlap = max(0.0, min(segment["end"], d["end"]) - max(segment["start"], d["start"]))
+                if overlap > best_overlap:
+                    best_overlap, best = overlap, d["speaker"]
+            if best is None:
+                best = _speaker_at_brute((segment["start"] + segment["end"]) / 2, diarization_segments)
+        labels.append(speaker_map[best] if best else "不明")
+    return labels
+
+
+def test_assign_speakers_matches_brute_force(dv2):
+    rng = np.random.RandomState(0)
+    for _ in range(2000):
+        diarization = []
+        for _ in range(rng.randint(0, 15)):
+            start = int(rng.randint(0, 21))
+            diarization.append(
+                {"start": start, "end": start + int(rng.randint(1, 7)), "speaker": "ABCD"[rng.randint(4)]}
+            )
+        diarization.sort(key=lambda d: d["start"])
+        segments = []
+        for _ in range(rng.randint(1, 9)):
+            start = int(rng.randint(0, 26))
+            words, t = [], float(start)
+            if rng.rand() < 0.6:
+                for _ in range(rng.randint(0, 6)):
+                    length = float(rng.choice([0.0, 0.5, 1.0, 2.0]))
+                    words.append({"start": t, "end": t + length})
+                    t += length
+                if rng.rand() < 0.2:
+                    words.append({"start": None, "end": 1.0})
+            segments.append({"start": start, "end": start + int(rng.randint(1, 6)), "text": " x ", "words": words})
+        whisper_result = {"segments": segments}
+
+        (starts, ends, speakers, texts), used = dv2.assign_speakers_to_segments(whisper_result, diarization)
+        assert speakers == _assign_brute(whisper_result, diarization)
+        assert starts.tolist() == [s["start"] for s in segments]
+        assert ends.tolist() == [s["end"] for s in segments]
+        assert texts == ["x"] * len(segments)
+        assert set(used) == set(speakers) - {"不明"}
+
+
+def test_assign_speakers_uses_name_map(dv2):
+    diarization = [{"start": 0.0, "end": 5.0, "speaker": "S1"}, {"start": 5.0, "end": 9.0, "speaker": "S0"}]
+    whisper_result = {"segments": [{"start": 0.0, "end": 4.0, "text": "a"}, {"start": 6.0, "end": 8.0, "text": "b"}]}
+    (_, _, speakers, _), used = dv2.assign_speakers_to_segments(
+        whisper_result, diarization, name_map={"発話者1": "山田", "発話者2": None}
+    )
+    # 採番は生ラベル昇順（S0→発話者1）。未識別は発話者Nのまま
+    assert speakers == ["発話者2", "山田"]
+    assert used == ["発話者2", "山田"]
@@ -0,0 +1,185 @@
+"""transcriber の純ロジック（wav 読み込み・時刻整形）のテスト。mlx は読み込まない。"""
+
+import threading
+import wave
+
+import numpy as np
+
+from meeting_transcriber import transcriber as tr
+
+
+def _write_wav(path, samples, rate=16000, channels=1):
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(np.asarray(samples, dtype="<i2").tobytes())
+
+
+def test_load_audio_array_matches_ffmpeg_scaling(tmp_path):
+    path = tmp_path / "a.wav"
+    _write_wav(path, [0, 16384, -32768, 32767])
+    audio = tr.load_audio_array(str(path))
+    assert audio.dtype == np.float32
+    np.testing.assert_allclose(audio, [0.0, 0.5, -1.0, 32767 / 32768])
+
+
+def test_load_audio_array_skips_extra_chunks(tmp_path):
+    # ffmpeg は data の前に LIST チャンクを書くことがある。本体の位置を正しく拾えること
+    samples = np.arange(-500, 500, dtype="<i2")
+    fmt = (1).to_bytes(2, "little") + (1).to_bytes(2, "little") + (16000).to_bytes(4, "little")
+    fmt += (32000).to_bytes(4, "little") + (2).to_bytes(2, "little") + (16).to_bytes(2, "little")
+    body = b"WAVE" + b"fmt " + len(fmt).to_bytes(4, "little") + fmt
+    body += b"LIST" + (6).to_bytes(4, "little") + b"INFOab"
+    body += b"data" + samples.nbytes.to_bytes(4, "little") + samples.tobytes()
+    path = tmp_path / "c.wav"
+    path.write_bytes(b"RIFF" + len(body).to_bytes(4, "little") + body)
+    np.testing.assert_array_equal(tr.load_audio_array(str(path)), samples.astype(np.float32) / 32768.0)
+
+
+def _streamed_wav(path, samples, data_size=0xFFFFFFFF):
+    # パイプ書き出しの wav はサイズ欄が確定しない（0xFFFFFFFF や 0 のまま）
+    samples = np.asarray(samples, dtype="<i2")
+    _write_wav(path, samples)
+    raw = bytearray(path.read_bytes())
+    pos = raw.index(b"data") + 4
+    raw[pos : pos + 4] = data_size.to_bytes(4, "little")
+    path.write_bytes(bytes(raw))
+
+
+def test_load_audio_array_caps_unknown_data_size(tmp_path):
+    path = tmp_path / "s.wav"
+    _streamed_wav(path, [0, 16384, -32768])
+    np.testing.assert_allclose(tr.load_audio_array(str(path)), [0.0, 0.5, -1.0])
+
+
+def test_is_16k_mono_wav_rejects_unfinished_headers(tmp_path):
+    good = tmp_path / "good.wav"
+    _write_wav(good, [0, 1, 2])
+    assert tr.is_16k_mono_wav(str(good))
+    for size in (0xFFFFFFFF, 0):
+        path = tmp_path / f"{size}.wav"
+        _streamed_wav(path, [0, 1, 2], data_size=size)
+        assert not tr.is_16k_mono_wav(str(path))
+
+
+def test_load_audio_array_empty(tmp_path):
+    path = tmp_path / "d.wav"
+    _write_wav(path, [])
+    assert tr.load_audio_array(str(path)).shape == (0,)
+
+
+def test_load_audio_array_rejects_other_formats(tmp_path):
+    path = tmp_path / "b.wav"
+    _write_wav(path, [0, 1, 2, 3], rate=44100)
+    assert tr.load_audio_array(str(path)) is None
+
+
+def test_load_audio_array_returns_none_for_non_wav(tmp_path):
+    # mp3 等はパスのまま mlx_whisper に任せる。壊れたヘッダも同様
+    mp3 = tmp_path / "a.mp3"
+    mp3.write_bytes(b"ID3\x04\x00\x00\x00\x00\x00\x00" + b"\xff\xfb" * 64)
+    assert tr.load_audio_array(str(mp3)) is None
+    truncated = tmp_path / "t.wav"
+    truncated.write_bytes(b"RIFF\x24\x00")
+    assert tr.load_audio_array(str(truncated)) is None
+
+
+def test_ensure_audio_caches_per_video_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(tr.tempfile, "gettempdir", lambda: str(tmp_path))
+    calls = []
+
+    def fake_extract(video, out):
+        calls.append(video)
+        _write_wav(out, [0, 1])
+
+    monkeypatch.setattr(tr, "extract_audio", fake_extract)
+    a = tmp_path / "a" / "recording.mp4"
+    b = tmp_path / "b" / "recording.mp4"
+    for video in (a, b):
+        video.parent.mkdir()
+        video.write_bytes(b"x")
+
+    wav_a = tr.ensure_audio(str(a))
+    wav_b = tr.ensure_audio(str(b))
+    # 同名でも別フォルダの動画は別キャッシュ。2回目は抽出しない
+    assert wav_a != wav_b
+    assert tr.ensure_audio(str(a)) == wav_a
+    assert len(calls) == 2
+    assert not list((tmp_path / "meeting_transcriber").glob("*.part.wav"))
+
+
+def test_ensure_audio_concurrent_extractions_use_separate_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(tr.tempfile, "gettempdir", lambda: str(tmp_path))
+    video = tmp_path / "v.mp4"
+    video.write_bytes(b"x")
+    outs = []
+
+    def fake_extract(src, out):
+        outs.append(out)
+        if len(outs) == 1:
+            # 1本目の抽出中に別の抽出が同じ動画を処理する
+            tr.ensure_audio(str(video))
+        _write_wav(out, [0, 1])
+
+    monkeypatch.setattr(tr, "extract_audio", fake_extract)
+    wav = tr.ensure_audio(str(video))
+    assert len(set(outs)) == 2
+    assert tr.load_audio_array(wav).shape == (2,)
+    assert not list((tmp_path / "meeting_transcriber").glob("*.part.wav"))
+
+
+def test_ensure_audio_uses_whisper_ready_wav_as_is(tmp_path, monkeypatch):
+    monkeypatch.setattr(tr.tempfile, "gettempdir", lambda: str(tmp_path))
+    calls = []
+    monkeypatch.setattr(tr, "extract_audio", lambda video, out: (calls.append(video), _write_wav(out, [0])))
+
+    ready = tmp_path / "ready.WAV"
+    _write_wav(ready, [0, 1, 2])
+    assert tr.ensure_audio(str(ready)) == str(ready)
+    assert calls == []
+
+    # 44.1kHz の wav は変換が要るので従来どおり抽出する
+    other = tmp_path / "other.wav"
+    _write_wav(other, [0, 1, 2], rate=44100)
+    assert tr.ensure_audio(str(other)) != str(other)
+    assert calls == [str(other)]
+
+
+def test_transcribe_videos_overlaps_next_extraction(tmp_path, monkeypatch):
+    videos = []
+    for name in ("a", "b", "c"):
+        video = tmp_path / f"{name}.mp4"
+        video.write_bytes(b"x")
+        videos.append(str(video))
+    first_decoding = threading.Event()
+    second_extracted = threading.Event()
+
+    def fake_ensure(video):
+        if video == videos[1]:
+            # 2本目の抽出は1本目の文字起こしと重なって進む
+            assert first_decoding.wait(5)
+            second_extracted.set()
+        return video + ".wav"
+
+    def fake_transcribe(audio, *args):
+        if audio == videos[0] + ".wav":
+            first_decoding.set()
+            assert second_extracted.wait(5)
+        return {"text": audio}
+
+    monkeypatch.setattr(tr.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(tr, "ensure_audio", fake_ensure)
+    monkeypatch.setattr(tr, "transcribe_audio", fake_transcribe)
+    monkeypatch.setattr(tr, "preload_model", lambda model_name: None)
+
+    results = tr.transcribe_videos(videos)
+    assert [audio for _, audio in results] == [v + ".wav" for v in videos]
+    assert [result["text"] for result, _ in results] == [v + ".wav" for v in videos]
+
+
+def test_format_timestamp():
+    assert tr.format_timestamp(0) == "00:00"
+    assert tr.format_timestamp(65.9) == "01:05"
+    assert tr.format_timestamp(3599.5) == "59:59"
+    assert tr.format_timestamp(7325) == "122:05"
@@ -15,6 +15,17 @@ def test_cosine():
     assert vp._cosine(a, np.zeros(3)) == 0.0  # ゼロベクトルは0
 
 
+def test_cosine_matrix_matches_pairwise():
+    rng = np.random.RandomState(2)
+    a, b = rng.randn(3, 8), rng.randn(4, 8)
+    b[1] = 0.0
+    m = vp._cosine_matrix(a, b)
+    assert m.shape == (3, 4)
+    for i in range(3):
+        for j in range(4):
+            assert abs(m[i, j] - vp._cosine(a[i], b[j])) < 1e-12
+
+
 def test_label_sort_key():
     assert vp._label_sort_key("発話者12") == 12
     assert vp._label_sort_key("発話者1") == 1